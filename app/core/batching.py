@@ -0,0 +1,106 @@
+"""
+Micro-batching for calls that are cheaper in bulk (insert_many, FCM, LLM)
+"""
+import asyncio
+from typing import Any, Awaitable, Callable, List, Optional
+
+# Queued by aclose(): dispatch what is buffered, then stop
+_CLOSE = object()
+
+
+class MicroBatcher:
+    """
+    Collects items for up to `max_wait` seconds (or `max_size` items) and
+    hands each batch to `dispatch`, without waiting for earlier batches
+
+    `dispatch(items)` returns one result per item, in order; an Exception in
+    that list fails only its own item, and a raised exception fails the
+    whole batch. Fire-and-forget dispatchers may return None.
+    """
+
+    def __init__(
+        self,
+        dispatch: Callable[[List[Any]], Awaitable[Optional[List[Any]]]],
+        max_size: int,
+        max_wait: float
+    ):
+        self.dispatch = dispatch
+        self.max_size = max_size
+        self.max_wait = max_wait
+        self._queue: Optional[asyncio.Queue] = None
+        self._worker: Optional[asyncio.Task] = None
+        self._inflight: set = set()  # keep dispatch tasks referenced until done
+
+    def _ensure_worker(self):
+        """Start the collector on first use (or after it was closed)"""
+        if self._worker is None or self._worker.done():
+            self._queue = asyncio.Queue()
+            self._worker = asyncio.create_task(self._run())
+
+    async def submit(self, item: Any) -> Any:
+        """Queue an item and wait for its result"""
+        self._ensure_worker()
+        future = asyncio.get_running_loop().create_future()
+        self._queue.put_nowait((item, future))
+        return await future
+
+    def submit_nowait(self, item: Any):
+        """Queue an item without waiting for it (dispatch reports its own errors)"""
+        self._ensure_worker()
+        self._queue.put_nowait((item, None))
+
+    async def aclose(self):
+        """Dispatch everything queued and wait for in-flight batches"""
+        if self._worker is None or self._worker.done():
+            return
+        self._queue.put_nowait(_CLOSE)
+        await self._worker
+        self._worker = None
+
+    async def _run(self):
+        """Collect batches from the queue and dispatch them until closed"""
+        loop = asyncio.get_running_loop()
+        closing = False
+        while not closing:
+            entry = await self._queue.get()
+            if entry is _CLOSE:
+                break
+            batch = [entry]
+            deadline = loop.time() + self.max_wait
+
+            while len(batch) < self.max_size:
+                remaining = deadline - loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    entry = await asyncio.wait_for(self._queue.get(), remaining)
+                except asyncio.TimeoutError:
+                    break
+                if entry is _CLOSE:
+                    closing = True
+                    break
+                batch.append(entry)
+
+            task = asyncio.create_task(self._dispatch(batch))
+            self._inflight.add(task)
+            task.add_done_callback(self._inflight.discard)
+
+        if self._inflight:
+            await asyncio.gather(*self._inflight, return_exceptions=True)
+
+    async def _dispatch(self, batch: List[tuple]):
+        """Run dispatch on one batch and resolve each item's future"""
+        try:
+            results = await self.dispatch([item for item, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+        if results is None:
+            results = [None] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if future is None or future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
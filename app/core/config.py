@@ -1,8 +1,11 @@
 """
 Configuration settings for Jarvis AI Assistant
 """
+from functools import cached_property, lru_cache
 from pydantic_settings import BaseSettings
-from typing import Optional
+from typing import Optional, Dict, Any
+import orjson
+import os
 
 
 class Settings(BaseSettings):
@@ -13,6 +16,7 @@ class Settings(BaseSettings):
     APP_VERSION: str = "1.0.0"
     DEBUG: bool = True
     PORT: int = 8000
+    ENABLE_CORS: bool = False
     
     # API Keys
     OPENAI_API_KEY: str
@@ -21,10 +25,16 @@ class Settings(BaseSettings):
     # Database
     MONGODB_URL: str = "mongodb://localhost:27017"
     MONGODB_DB_NAME: str = "jarvis_db"
+    MONGO_MIN_POOL: int = 10
+    MONGO_MAX_POOL: int = 50
+    MONGO_COMPRESSORS: str = "zstd,snappy"
     
     # Redis
     REDIS_URL: str = "redis://localhost:6379/0"
     
+    # Scheduler job store: "redis" or "mongodb"
+    SCHEDULER_JOBSTORE: str = "redis"
+    
     # Vector Database
     PINECONE_API_KEY: Optional[str] = None
     PINECONE_ENVIRONMENT: Optional[str] = None
@@ -37,13 +47,20 @@ class Settings(BaseSettings):
     GOOGLE_PLACES_API_KEY: Optional[str] = None
     
     # Firebase
-    FIREBASE_CREDENTIALS_PATH: Optional[str] = None
+    FIREBASE_CREDENTIALS_PATH: Optional[str] = "./app/jarvis-firebase-adminsdk.json"
+    FIREBASE_CREDENTIALS_JSON: Optional[str] = None  # used when the file is missing
     FIREBASE_PROJECT_ID: Optional[str] = None
     
     # AI Models
     DEFAULT_LLM_MODEL: str = "gpt-4o-mini"
+    INTENT_LLM_MODEL: str = "gpt-4o-mini"  # small model, JSON mode
     DEFAULT_TTS_VOICE: str = "alloy"
+    TTS_RESPONSE_FORMAT: str = "mp3"  # mp3/aac/opus; sentence chunks are concatenated, so no flac
     DEFAULT_STT_MODEL: str = "whisper-1"
+    LOCAL_INTENT_MODEL: Optional[str] = "all-MiniLM-L6-v2"  # needs sentence-transformers
+    LOCAL_TTS_MODEL: Optional[str] = None  # Piper .onnx voice path (int8 recommended), needs piper-tts
+    LOCAL_TTS_MAX_CHARS: int = 200  # longer text goes to OpenAI TTS
+    ENABLE_HISTORY_CONTEXT: bool = False  # fetch recent conversations into user context
     
     # Web Search
     ENABLE_WEB_SEARCH: bool = False
@@ -53,6 +70,29 @@ class Settings(BaseSettings):
     class Config:
         env_file = ".env"
         case_sensitive = True
+    
+    @cached_property
+    def firebase_credentials(self) -> Optional[Dict[str, Any]]:
+        """
+        Firebase service account JSON, read on first access only
+        
+        Raises:
+            OSError: If the credentials file can't be read
+            orjson.JSONDecodeError: If the credentials aren't valid JSON
+        """
+        if self.FIREBASE_CREDENTIALS_PATH and os.path.exists(self.FIREBASE_CREDENTIALS_PATH):
+            with open(self.FIREBASE_CREDENTIALS_PATH, "rb") as f:
+                return orjson.loads(f.read())
+        if self.FIREBASE_CREDENTIALS_JSON:
+            return orjson.loads(self.FIREBASE_CREDENTIALS_JSON)
+        return None
+
+
+@lru_cache(maxsize=1)
+def get_settings() -> Settings:
+    """Get cached settings instance (usable as a FastAPI dependency)"""
+    return Settings()
 
 
-settings = Settings()
+# Backward compatible alias
+settings = get_settings()
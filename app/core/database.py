@@ -2,10 +2,12 @@
 Database connection and initialization
 """
 from motor.motor_asyncio import AsyncIOMotorClient
+import bson
+import asyncio
 from typing import Optional
 import logging
 
-from app.core.config import settings
+from app.core.config import get_settings
 
 logger = logging.getLogger(__name__)
 
@@ -17,9 +19,22 @@ database = None
 async def init_db():
     """Initialize database connection"""
     global mongodb_client, database
+    settings = get_settings()
+    
+    if not bson.has_c():
+        logger.warning("⚠️ bson C extension not available, falling back to slow pure-Python BSON")
     
     try:
-        mongodb_client = AsyncIOMotorClient(settings.MONGODB_URL)
+        mongodb_client = AsyncIOMotorClient(
+            settings.MONGODB_URL,
+            maxPoolSize=settings.MONGO_MAX_POOL,
+            minPoolSize=settings.MONGO_MIN_POOL,
+            maxIdleTimeMS=60000,
+            waitQueueTimeoutMS=2500,
+            serverSelectionTimeoutMS=3000,
+            connectTimeoutMS=3000,
+            compressors=settings.MONGO_COMPRESSORS
+        )
         database = mongodb_client[settings.MONGODB_DB_NAME]
         
         # Test connection
@@ -36,30 +51,46 @@ async def init_db():
 
 async def close_db():
     """Close database connection"""
-    global mongodb_client
+    global mongodb_client, database
     if mongodb_client:
-        mongodb_client.close()
-        logger.info("✅ MongoDB connection closed")
+        try:
+            mongodb_client.close()
+            logger.info("✅ MongoDB connection closed")
+        except Exception as e:
+            logger.warning(f"⚠️ Error closing MongoDB connection: {e}")
+        finally:
+            mongodb_client = None
+            database = None
 
 
 async def create_indexes():
-    """Create database indexes"""
-    try:
-        # Users collection
-        await database.users.create_index("user_id", unique=True)
-        
-        # Alarms collection
-        await database.alarms.create_index([("user_id", 1), ("alarm_time", 1)])
-        
+    """Create database indexes concurrently"""
+    indexes = {
+        # Users collection (point lookups by user_id)
+        "users.user_id": database.users.create_index("user_id", unique=True),
+        # Alarms collection (active alarms by time, and most recent first)
+        "alarms.user_id_active_alarm_time": database.alarms.create_index(
+            [("user_id", 1), ("active", 1), ("alarm_time", 1)]
+        ),
+        "alarms.user_id_active_created_at": database.alarms.create_index(
+            [("user_id", 1), ("active", 1), ("created_at", -1)]
+        ),
         # Conversations collection
-        await database.conversations.create_index([("user_id", 1), ("timestamp", -1)])
-        
-        # User preferences collection
-        await database.user_preferences.create_index("user_id", unique=True)
-        
+        "conversations.user_id_timestamp": database.conversations.create_index([("user_id", 1), ("timestamp", -1)]),
+        # User preferences collection (point lookups and upserts by user_id)
+        "user_preferences.user_id": database.user_preferences.create_index("user_id", unique=True),
+    }
+    
+    results = await asyncio.gather(*indexes.values(), return_exceptions=True)
+    
+    failed = False
+    for name, result in zip(indexes, results):
+        if isinstance(result, Exception):
+            failed = True
+            logger.warning(f"⚠️ Index creation warning ({name}): {result}")
+    
+    if not failed:
         logger.info("✅ Database indexes created")
-    except Exception as e:
-        logger.warning(f"⚠️ Index creation warning: {e}")
 
 
 def get_database():
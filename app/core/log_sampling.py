@@ -0,0 +1,12 @@
+"""
+Log sampling - keep tracebacks on hot paths without paying for every one
+"""
+import random
+
+# Fraction of hot-path errors logged with a full traceback
+TRACEBACK_SAMPLE_RATE = 0.01
+
+
+def should_log_tb() -> bool:
+    """Whether this error should be logged with its traceback (sampled)"""
+    return random.random() < TRACEBACK_SAMPLE_RATE
@@ -0,0 +1,106 @@
+"""
+Lightweight ASGI middleware
+"""
+from contextvars import ContextVar
+from typing import Callable, List, Optional, Tuple
+
+# Static preflight headers, built once
+_PREFLIGHT_HEADERS: List[Tuple[bytes, bytes]] = [
+    (b"access-control-allow-methods", b"DELETE, GET, HEAD, OPTIONS, PATCH, POST, PUT"),
+    (b"access-control-allow-credentials", b"true"),
+    (b"access-control-max-age", b"600"),
+    (b"content-length", b"0"),
+]
+
+# Streamed media types; compressing them buffers frames until the encoder flushes
+_UNCOMPRESSED_TYPES: Tuple[bytes, ...] = (b"application/x-ndjson", b"text/event-stream")
+
+# Un-compressed send of the request being handled, read below the compressor
+_raw_send: ContextVar[Optional[Callable]] = ContextVar("raw_send", default=None)
+
+
+class PreflightMiddleware:
+    """
+    Answers CORS preflight requests directly at the ASGI layer
+
+    Skips Starlette's Request/Response construction for OPTIONS requests
+    carrying Access-Control-Request-Method. All other traffic passes through.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        origin = None
+        request_headers = None
+        is_preflight = False
+        for name, value in scope["headers"]:
+            if name == b"origin":
+                origin = value
+            elif name == b"access-control-request-method":
+                is_preflight = True
+            elif name == b"access-control-request-headers":
+                request_headers = value
+
+        if not is_preflight or origin is None:
+            await self.app(scope, receive, send)
+            return
+
+        headers = list(_PREFLIGHT_HEADERS)
+        headers.append((b"access-control-allow-origin", origin))
+        headers.append((b"vary", b"Origin"))
+        if request_headers:
+            headers.append((b"access-control-allow-headers", request_headers))
+
+        await send({"type": "http.response.start", "status": 204, "headers": headers})
+        await send({"type": "http.response.body", "body": b""})
+
+
+class StreamingAwareCompression:
+    """
+    Wraps a compression middleware (Brotli/GZip) but lets streamed
+    responses (NDJSON, server-sent events) bypass it
+
+    The choice is made per response from its Content-Type: streamed
+    responses are sent on the original send, everything else goes
+    through the compressor.
+    """
+
+    def __init__(self, app, compressor, **options):
+        self.app = app
+        self.compressed = compressor(self._route, **options)
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        token = _raw_send.set(send)
+        try:
+            await self.compressed(scope, receive, send)
+        finally:
+            _raw_send.reset(token)
+
+    async def _route(self, scope, receive, send):
+        raw_send = _raw_send.get()
+        target = send
+
+        async def route_send(message):
+            nonlocal target
+            if message["type"] == "http.response.start" and _is_streamed(message):
+                target = raw_send
+            await target(message)
+
+        await self.app(scope, receive, route_send)
+
+
+def _is_streamed(message) -> bool:
+    """Check a response start message for a streamed media type"""
+    for name, value in message.get("headers", ()):
+        if name.lower() == b"content-type":
+            return value.startswith(_UNCOMPRESSED_TYPES)
+    return False
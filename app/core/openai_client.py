@@ -0,0 +1,22 @@
+"""
+Shared OpenAI client
+"""
+from functools import lru_cache
+import httpx
+from openai import AsyncOpenAI
+
+from app.core.config import get_settings
+
+
+@lru_cache(maxsize=1)
+def get_openai() -> AsyncOpenAI:
+    """Get the process-wide AsyncOpenAI client (usable as a FastAPI dependency)"""
+    return AsyncOpenAI(
+        api_key=get_settings().OPENAI_API_KEY,
+        http_client=httpx.AsyncClient(
+            # Every service (LLM, STT, TTS, embeddings) shares this pool
+            limits=httpx.Limits(max_connections=200, max_keepalive_connections=50),
+            timeout=httpx.Timeout(30.0, connect=5.0),
+            http2=True
+        )
+    )
@@ -0,0 +1,13 @@
+"""
+Shared Redis client
+"""
+from functools import lru_cache
+import redis.asyncio as redis
+
+from app.core.config import get_settings
+
+
+@lru_cache(maxsize=1)
+def get_redis() -> redis.Redis:
+    """Get the process-wide async Redis client (usable as a FastAPI dependency)"""
+    return redis.from_url(get_settings().REDIS_URL)
@@ -1,20 +1,39 @@
 """
 Jarvis AI Assistant - Main FastAPI Application
 """
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import ORJSONResponse, Response
 from contextlib import asynccontextmanager
 import logging
+import orjson
 
-from app.core.config import settings
-from app.core.database import init_db, close_db
+from app.core.config import get_settings
+from app.core.database import init_db, close_db, get_database
+from app.core.middleware import PreflightMiddleware, StreamingAwareCompression
+from app.core.openai_client import get_openai
+from app.core.redis_client import get_redis
 from app.routers import conversation, users, alarms, flights, chat, intent, firebase
 from app.services.scheduler import scheduler
+from app.services.reminders import get_reminders_service
+from app.services.firebase_reminders import get_firebase_service
+from app.services.flights import get_flights_service
+from app.services.orchestrator import orchestrator
 
-# Configure logging
-logging.basicConfig(level=logging.INFO)
+settings = get_settings()
+
+# Configure logging (production skips INFO records entirely)
+logging.basicConfig(level=logging.INFO if settings.DEBUG else logging.WARNING)
 logger = logging.getLogger(__name__)
 
+# Brotli compression is optional, fall back to gzip when not installed
+try:
+    from brotli_asgi import BrotliMiddleware
+    BROTLI_AVAILABLE = True
+except ImportError:
+    BROTLI_AVAILABLE = False
+
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
@@ -22,7 +41,17 @@ async def lifespan(app: FastAPI):
     # Startup
     logger.info("🚀 Starting Jarvis AI Assistant...")
     await init_db()
+    db = get_database()
+    app.state.conversations = db.conversations
+    app.state.users = db.users
+    app.state.user_preferences = db.user_preferences
     scheduler.start()
+    
+    # Warm up shared services so their setup cost is paid at startup
+    app.state.reminders = get_reminders_service()
+    app.state.firebase = get_firebase_service()
+    await app.state.firebase.restore_scheduled()
+    app.state.flights = get_flights_service()
     logger.info("✅ Application started successfully")
     
     yield
@@ -30,6 +59,10 @@ async def lifespan(app: FastAPI):
     # Shutdown
     logger.info("🛑 Shutting down Jarvis AI Assistant...")
     scheduler.shutdown()
+    await orchestrator.memory_service.aclose()
+    await get_openai().close()
+    await get_redis().close()
+    await get_flights_service().aclose()
     await close_db()
     logger.info("✅ Application shutdown complete")
 
@@ -38,17 +71,42 @@ app = FastAPI(
     title=settings.APP_NAME,
     version=settings.APP_VERSION,
     description="Jarvis-style Personal AI Assistant with voice commands",
+    default_response_class=ORJSONResponse,
     lifespan=lifespan
 )
 
-# CORS middleware
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],  # Configure based on your needs
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
+
+@app.exception_handler(Exception)
+async def unhandled_exception_handler(request: Request, exc: Exception):
+    """Log unexpected errors once and return a generic 500"""
+    logger.error("❌ Unhandled error on %s %s: %r", request.method, request.url.path, exc)
+    return ORJSONResponse(status_code=500, content={"error": "Internal error"})
+
+
+# CORS middleware (only needed for browser clients)
+if settings.ENABLE_CORS:
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],  # Configure based on your needs
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    # Answer preflight requests before they reach Starlette
+    app.add_middleware(PreflightMiddleware)
+
+# Response compression for list endpoints (small responses are skipped,
+# NDJSON/SSE streams bypass it so each line is flushed as it is sent)
+if BROTLI_AVAILABLE:
+    app.add_middleware(
+        StreamingAwareCompression,
+        compressor=BrotliMiddleware, minimum_size=1024, gzip_fallback=True
+    )
+else:
+    app.add_middleware(
+        StreamingAwareCompression,
+        compressor=GZipMiddleware, minimum_size=1024, compresslevel=5
+    )
 
 # Include routers
 app.include_router(conversation.router, prefix="/api", tags=["conversation"])
@@ -60,24 +118,29 @@ app.include_router(intent.router, tags=["intent"])  # Simple Intent Classificati
 app.include_router(firebase.router, prefix="/api/firebase", tags=["firebase"])  # Firebase notifications
 
 
+# Health payloads are constant, so serialize them once
+_ROOT_BYTES = orjson.dumps({
+    "status": "online",
+    "app": settings.APP_NAME,
+    "version": settings.APP_VERSION
+})
+_HEALTH_BYTES = orjson.dumps({
+    "status": "healthy",
+    "database": "connected",
+    "scheduler": "running"
+})
+
+
 @app.get("/")
 async def root():
     """Health check endpoint"""
-    return {
-        "status": "online",
-        "app": settings.APP_NAME,
-        "version": settings.APP_VERSION
-    }
+    return Response(_ROOT_BYTES, media_type="application/json")
 
 
 @app.get("/health")
 async def health():
     """Detailed health check"""
-    return {
-        "status": "healthy",
-        "database": "connected",
-        "scheduler": "running"
-    }
+    return Response(_HEALTH_BYTES, media_type="application/json")
 
 
 if __name__ == "__main__":
@@ -86,5 +149,11 @@ if __name__ == "__main__":
         "app.main:app",
         host="0.0.0.0",
         port=settings.PORT,
-        reload=settings.DEBUG
+        reload=settings.DEBUG,
+        loop="uvloop",
+        http="httptools",
+        # One worker: the APScheduler and reminder timers run in-process
+        # and must not be duplicated across workers sharing the job store
+        workers=1,
+        log_level="info" if settings.DEBUG else "warning"
     )
@@ -1,36 +1,43 @@
 """
 Pydantic schemas for request/response validation
 """
-from pydantic import BaseModel, Field
-from typing import Optional, Dict, Any, List
+from pydantic import BaseModel, ConfigDict, Field
+from typing import Optional, Any
 from datetime import datetime
 from enum import Enum
 
 
 class ConversationRequest(BaseModel):
     """Request for conversation endpoint"""
-    user_id: str
-    audio: Optional[str] = None  # Base64 encoded audio
-    text: Optional[str] = None   # Direct text input
-    
-    class Config:
-        json_schema_extra = {
+    model_config = ConfigDict(
+        extra="ignore",
+        populate_by_name=True,
+        json_schema_extra={
             "example": {
                 "user_id": "user_123",
                 "text": "Set an alarm for 6 AM"
             }
         }
+    )
+
+    user_id: str
+    audio: Optional[str] = None  # Base64 encoded audio
+    text: Optional[str] = None   # Direct text input
+    want_audio: bool = True  # Text-only clients can skip TTS
 
 
 class ConversationResponse(BaseModel):
     """Response from conversation endpoint"""
+    model_config = ConfigDict(extra="ignore")
+
     success: bool
     transcription: Optional[str] = None  # What the user said (from STT)
     text_response: str  # AI's response text
     audio_response: Optional[str] = None  # Base64 encoded audio (TTS)
+    audio_mime_type: Optional[str] = None  # e.g. audio/mpeg, or audio/wav from the local voice
     intent: str
     confidence: float
-    data: Optional[Dict[str, Any]] = None
+    data: Optional[dict[str, Any]] = None
 
 
 class IntentType(str, Enum):
@@ -46,14 +53,18 @@ class IntentType(str, Enum):
 
 class Intent(BaseModel):
     """Parsed intent from user input"""
+    model_config = ConfigDict(extra="ignore", populate_by_name=True)
+
     intent: IntentType
-    slots: Dict[str, Any] = Field(default_factory=dict)
+    slots: dict[str, Any] = Field(default_factory=dict)
     confidence: float
     original_text: str
 
 
 class UserPreferences(BaseModel):
     """User preferences for personalization"""
+    model_config = ConfigDict(extra="ignore", populate_by_name=True)
+
     user_id: str
     timezone: str = "UTC"
     alarm_tone: str = "default"
@@ -66,6 +77,8 @@ class UserPreferences(BaseModel):
 
 class AlarmCreate(BaseModel):
     """Create alarm request"""
+    model_config = ConfigDict(extra="ignore", populate_by_name=True)
+
     user_id: str
     alarm_time: datetime
     repeat: bool = False
@@ -73,8 +86,27 @@ class AlarmCreate(BaseModel):
     tone: Optional[str] = None
 
 
+class AlarmBulkItem(BaseModel):
+    """One alarm in a bulk create request"""
+    model_config = ConfigDict(extra="ignore")
+
+    alarm_time: datetime
+    repeat: bool = False
+    label: Optional[str] = None
+
+
+class AlarmBulkCreate(BaseModel):
+    """Create several alarms for one user"""
+    model_config = ConfigDict(extra="ignore")
+
+    user_id: str
+    alarms: list[AlarmBulkItem] = Field(min_length=1, max_length=50)
+
+
 class AlarmResponse(BaseModel):
     """Alarm response"""
+    model_config = ConfigDict(frozen=True)
+
     id: str
     user_id: str
     alarm_time: datetime
@@ -86,6 +118,8 @@ class AlarmResponse(BaseModel):
 
 class FlightSearchRequest(BaseModel):
     """Flight search request"""
+    model_config = ConfigDict(extra="ignore", populate_by_name=True)
+
     user_id: str
     source: str
     destination: str
@@ -96,6 +130,8 @@ class FlightSearchRequest(BaseModel):
 
 class FlightResult(BaseModel):
     """Single flight result"""
+    model_config = ConfigDict(frozen=True)
+
     airline: str
     flight_number: str
     departure_time: str
@@ -109,6 +145,8 @@ class FlightResult(BaseModel):
 
 class FlightSearchResponse(BaseModel):
     """Flight search response"""
+    model_config = ConfigDict(frozen=True)
+
     success: bool
-    flights: List[FlightResult]
+    flights: list[FlightResult]
     count: int
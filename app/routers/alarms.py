@@ -1,25 +1,27 @@
 """
 Alarms Router
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 import logging
 
-from app.models.schemas import AlarmCreate
-from app.services.reminders import RemindersService
+from app.models.schemas import AlarmCreate, AlarmBulkCreate
+from app.services.reminders import RemindersService, get_reminders_service
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-reminders_service = RemindersService()
 
 
 @router.post("/")
-async def create_alarm(alarm: AlarmCreate):
+async def create_alarm(
+    alarm: AlarmCreate,
+    reminders_service: RemindersService = Depends(get_reminders_service)
+):
     """Create a new alarm"""
     try:
         result = await reminders_service.set_alarm(
             user_id=alarm.user_id,
-            time=alarm.alarm_time.strftime("%I:%M %p"),
+            time=alarm.alarm_time,
             repeat=alarm.repeat,
             label=alarm.label
         )
@@ -27,29 +29,57 @@ async def create_alarm(alarm: AlarmCreate):
         return result
         
     except Exception as e:
-        logger.error(f"❌ Error creating alarm: {e}")
+        logger.error("❌ Error creating alarm: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+
+@router.post("/bulk")
+async def create_alarms_bulk(
+    request: AlarmBulkCreate,
+    reminders_service: RemindersService = Depends(get_reminders_service)
+):
+    """Create several alarms at once (one result per alarm, in order)"""
+    try:
+        results = await reminders_service.set_alarms_bulk(
+            request.user_id,
+            [
+                {"time": alarm.alarm_time, "repeat": alarm.repeat, "label": alarm.label}
+                for alarm in request.alarms
+            ]
+        )
+        
+        return {"success": True, "results": results}
+        
+    except Exception as e:
+        logger.error("❌ Error creating alarms: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/{user_id}")
-async def get_user_alarms(user_id: str):
+async def get_user_alarms(
+    user_id: str,
+    reminders_service: RemindersService = Depends(get_reminders_service)
+):
     """Get all alarms for a user"""
     try:
         alarms = await reminders_service.get_user_alarms(user_id)
         return {"success": True, "alarms": alarms}
         
     except Exception as e:
-        logger.error(f"❌ Error fetching alarms: {e}")
+        logger.error("❌ Error fetching alarms: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.delete("/{user_id}")
-async def delete_alarm(user_id: str):
+async def delete_alarm(
+    user_id: str,
+    reminders_service: RemindersService = Depends(get_reminders_service)
+):
     """Delete most recent alarm"""
     try:
         result = await reminders_service.delete_recent_alarm(user_id)
         return result
         
     except Exception as e:
-        logger.error(f"❌ Error deleting alarm: {e}")
+        logger.error("❌ Error deleting alarm: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
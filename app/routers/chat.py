@@ -2,7 +2,7 @@
 Simple ChatGPT Router - Direct ChatGPT endpoint
 """
 from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
+from pydantic import BaseModel, ConfigDict
 from typing import Optional
 import logging
 
@@ -20,13 +20,12 @@ class ChatRequest(BaseModel):
     include_context: bool = True
     use_web_search: bool = True
     
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "user_id": "user_123",
-                "text": "give me today's news"
-            }
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "user_id": "user_123",
+            "text": "give me today's news"
         }
+    })
 
 
 class ChatResponse(BaseModel):
@@ -71,7 +70,7 @@ async def chat_with_gpt(request: ChatRequest):
             raise HTTPException(status_code=500, detail=result.get("message"))
             
     except Exception as e:
-        logger.error(f"❌ Chat endpoint error: {e}")
+        logger.error("❌ Chat endpoint error: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -79,7 +78,7 @@ async def chat_with_gpt(request: ChatRequest):
 async def clear_chat_history(user_id: str):
     """Clear conversation history for a user"""
     try:
-        chatgpt_direct_service.clear_history(user_id)
+        await chatgpt_direct_service.clear_history(user_id)
         return {"success": True, "message": "Chat history cleared"}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -2,8 +2,10 @@
 Conversation Router
 Main endpoint for handling user conversations
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends, Request
+from fastapi.responses import StreamingResponse
 import logging
+import orjson
 
 from app.models.schemas import ConversationRequest, ConversationResponse
 from app.services.orchestrator import orchestrator
@@ -12,6 +14,23 @@ logger = logging.getLogger(__name__)
 
 router = APIRouter()
 
+# Fields returned by the history endpoint. The (user_id, timestamp) index
+# drives the filter and sort; the documents are still fetched for text,
+# intent and response, which the index does not hold.
+HISTORY_PROJECTION = {
+    "_id": 0,
+    "user_id": 1,
+    "timestamp": 1,
+    "text": 1,
+    "intent": 1,
+    "response": 1
+}
+
+
+def get_conversations_collection(request: Request):
+    """Conversations collection handle bound at startup"""
+    return request.app.state.conversations
+
 
 @router.post("/conversation", response_model=ConversationResponse)
 async def handle_conversation(request: ConversationRequest):
@@ -29,35 +48,59 @@ async def handle_conversation(request: ConversationRequest):
     6. Convert to speech
     """
     try:
-        logger.info(f"📥 Conversation request from user: {request.user_id}")
+        logger.info("📥 Conversation request from user: %s", request.user_id)
         
         # Process through orchestrator
         response = await orchestrator.process_conversation(request)
         
-        logger.info(f"✅ Response generated for user: {request.user_id}")
+        logger.info("✅ Response generated for user: %s", request.user_id)
         return response
         
     except Exception as e:
-        logger.error(f"❌ Conversation error: {e}", exc_info=True)
+        logger.error("❌ Conversation error: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
+@router.post("/conversation/stream")
+async def handle_conversation_stream(request: ConversationRequest):
+    """
+    Streaming conversation endpoint
+    
+    Returns NDJSON: the response (without audio) as soon as the text is
+    ready, then {"audio": ..., "mime_type": ...} lines with base64 audio
+    chunks. Set want_audio=false to get the text line only.
+    """
+    logger.info("📥 Streaming conversation request from user: %s", request.user_id)
+    return StreamingResponse(
+        orchestrator.process_conversation_stream(request),
+        media_type="application/x-ndjson"
+    )
+
+
 @router.get("/conversation/history/{user_id}")
-async def get_conversation_history(user_id: str, limit: int = 10):
-    """Get conversation history for a user"""
-    try:
-        from app.core.database import get_database
-        db = get_database()
-        
-        conversations = await db.conversations.find(
-            {"user_id": user_id}
-        ).sort("timestamp", -1).limit(limit).to_list(length=limit)
-        
-        return {
-            "success": True,
-            "conversations": conversations
-        }
-        
-    except Exception as e:
-        logger.error(f"❌ Error fetching history: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+async def get_conversation_history(
+    user_id: str,
+    limit: int = 10,
+    conversations=Depends(get_conversations_collection)
+):
+    """
+    Get conversation history for a user
+    
+    Streams one JSON document per line (NDJSON), newest first. Errors
+    raised after the response has started end the stream with a final
+    {"error": ...} line.
+    """
+    cursor = conversations.find(
+        {"user_id": user_id},
+        projection=HISTORY_PROJECTION
+    ).sort("timestamp", -1).limit(limit)
+    
+    async def generate():
+        try:
+            async for doc in cursor:
+                yield orjson.dumps(doc) + b"\n"
+        except Exception as e:
+            logger.error("❌ Error fetching history: %s", e)
+            yield orjson.dumps({"error": "Failed to fetch conversation history"}) + b"\n"
+    
+    return StreamingResponse(generate(), media_type="application/x-ndjson")
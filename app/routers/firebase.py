@@ -1,18 +1,17 @@
 """
 Firebase Router - Handle Firebase Cloud Messaging operations
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 from pydantic import BaseModel
 from typing import Optional, Dict, Any
 import logging
 from datetime import datetime
 
-from app.services.firebase_reminders import FirebaseRemindersService
+from app.services.firebase_reminders import FirebaseRemindersService, get_firebase_service
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-firebase_service = FirebaseRemindersService()
 
 
 class DeviceRegistrationRequest(BaseModel):
@@ -42,10 +41,13 @@ class ReminderCancelRequest(BaseModel):
 
 
 @router.post("/register-device")
-async def register_device(request: DeviceRegistrationRequest):
+async def register_device(
+    request: DeviceRegistrationRequest,
+    firebase_service: FirebaseRemindersService = Depends(get_firebase_service)
+):
     """Register a device for Firebase push notifications"""
     try:
-        logger.info(f"🔥 Registering device for user {request.user_id}")
+        logger.info("🔥 Registering device for user %s", request.user_id)
         
         result = await firebase_service.register_device(
             user_id=request.user_id,
@@ -63,16 +65,21 @@ async def register_device(request: DeviceRegistrationRequest):
         }
         
     except Exception as e:
-        logger.error(f"❌ Error registering device: {e}")
+        logger.error("❌ Error registering device: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to register device: {str(e)}")
 
 
 @router.post("/schedule-reminder")
-async def schedule_firebase_reminder(request: FirebaseReminderRequest):
+async def schedule_firebase_reminder(
+    request: FirebaseReminderRequest,
+    firebase_service: FirebaseRemindersService = Depends(get_firebase_service)
+):
     """Schedule a Firebase push notification reminder"""
     try:
-        logger.info(f"🔔 Scheduling Firebase reminder for user {request.user_id}")
-        logger.info(f"📥 Request data: user_id={request.user_id}, fcm_token={request.fcm_token[:20]}..., reminder_text={request.reminder_text}, scheduled_time={request.scheduled_time}")
+        logger.info("🔔 Scheduling Firebase reminder for user %s", request.user_id)
+        if logger.isEnabledFor(logging.INFO):
+            logger.info("📥 Request data: user_id=%s, fcm_token=%s..., reminder_text=%s, scheduled_time=%s",
+                        request.user_id, request.fcm_token[:20], request.reminder_text, request.scheduled_time)
         
         result = await firebase_service.schedule_reminder(
             user_id=request.user_id,
@@ -92,15 +99,18 @@ async def schedule_firebase_reminder(request: FirebaseReminderRequest):
         }
         
     except Exception as e:
-        logger.error(f"❌ Error scheduling Firebase reminder: {e}")
+        logger.error("❌ Error scheduling Firebase reminder: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to schedule reminder: {str(e)}")
 
 
 @router.delete("/cancel-reminder")
-async def cancel_firebase_reminder(request: ReminderCancelRequest):
+async def cancel_firebase_reminder(
+    request: ReminderCancelRequest,
+    firebase_service: FirebaseRemindersService = Depends(get_firebase_service)
+):
     """Cancel a scheduled Firebase push notification"""
     try:
-        logger.info(f"❌ Cancelling Firebase reminder {request.reminder_id} for user {request.user_id}")
+        logger.info("❌ Cancelling Firebase reminder %s for user %s", request.reminder_id, request.user_id)
         
         result = await firebase_service.cancel_reminder(
             user_id=request.user_id,
@@ -116,22 +126,26 @@ async def cancel_firebase_reminder(request: ReminderCancelRequest):
         }
         
     except Exception as e:
-        logger.error(f"❌ Error cancelling Firebase reminder: {e}")
+        logger.error("❌ Error cancelling Firebase reminder: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to cancel reminder: {str(e)}")
 
 
 @router.get("/test-notification/{user_id}")
-async def send_test_notification(user_id: str, fcm_token: str = None):
+async def send_test_notification(
+    user_id: str,
+    fcm_token: str = None,
+    firebase_service: FirebaseRemindersService = Depends(get_firebase_service)
+):
     """Send a test Firebase notification"""
     try:
-        logger.info(f"📧 Sending test notification to user {user_id}")
+        logger.info("📧 Sending test notification to user %s", user_id)
         
         if not fcm_token:
             # Try to get the token from user's registered devices
-            devices = await firebase_service.get_user_devices(user_id)
-            if not devices:
+            device = await firebase_service.get_first_device(user_id)
+            if not device:
                 raise HTTPException(status_code=404, detail="No registered devices found")
-            fcm_token = devices[0].get("fcm_token")
+            fcm_token = device.get("fcm_token")
         
         result = await firebase_service.send_test_notification(
             fcm_token=fcm_token,
@@ -146,12 +160,15 @@ async def send_test_notification(user_id: str, fcm_token: str = None):
         }
         
     except Exception as e:
-        logger.error(f"❌ Error sending test notification: {e}")
+        logger.error("❌ Error sending test notification: %s", e)
         raise HTTPException(status_code=500, detail=f"Failed to send test notification: {str(e)}")
 
 
 @router.get("/devices/{user_id}")
-async def get_user_devices(user_id: str):
+async def get_user_devices(
+    user_id: str,
+    firebase_service: FirebaseRemindersService = Depends(get_firebase_service)
+):
     """Get all registered devices for a user"""
     try:
         devices = await firebase_service.get_user_devices(user_id)
@@ -164,12 +181,15 @@ async def get_user_devices(user_id: str):
         }
         
     except Exception as e:
-        logger.error(f"❌ Error getting user devices: {e}")
+        logger.error("❌ Error getting user devices: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
 @router.get("/reminders/{user_id}")
-async def get_user_reminders(user_id: str):
+async def get_user_reminders(
+    user_id: str,
+    firebase_service: FirebaseRemindersService = Depends(get_firebase_service)
+):
     """Get all scheduled reminders for a user"""
     try:
         reminders = await firebase_service.get_user_reminders(user_id)
@@ -182,5 +202,5 @@ async def get_user_reminders(user_id: str):
         }
         
     except Exception as e:
-        logger.error(f"❌ Error getting user reminders: {e}")
+        logger.error("❌ Error getting user reminders: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
@@ -1,20 +1,22 @@
 """
 Flights Router
 """
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Depends
 import logging
 
 from app.models.schemas import FlightSearchRequest
-from app.services.flights import FlightsService
+from app.services.flights import FlightsService, get_flights_service
 
 logger = logging.getLogger(__name__)
 
 router = APIRouter()
-flights_service = FlightsService()
 
 
 @router.post("/search")
-async def search_flights(request: FlightSearchRequest):
+async def search_flights(
+    request: FlightSearchRequest,
+    flights_service: FlightsService = Depends(get_flights_service)
+):
     """Search for flights"""
     try:
         result = await flights_service.search_flights(
@@ -27,5 +29,5 @@ async def search_flights(request: FlightSearchRequest):
         return result
         
     except Exception as e:
-        logger.error(f"❌ Error searching flights: {e}")
+        logger.error("❌ Error searching flights: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
@@ -2,14 +2,19 @@
 Intent Classification API - Simple and Clean
 Returns user intent as string for mobile app routing decisions
 """
-from fastapi import APIRouter, HTTPException
-from pydantic import BaseModel
-from typing import Optional, Dict, Any
+from fastapi import APIRouter, HTTPException, Depends
+from pydantic import BaseModel, ConfigDict
+from typing import Optional, Dict, Any, List, Tuple
+from collections import OrderedDict
+import asyncio
+import hashlib
 import logging
-import json
+import orjson
 from openai import AsyncOpenAI
 
-from app.core.config import settings
+from app.core.batching import MicroBatcher
+from app.core.openai_client import get_openai
+from app.core.redis_client import get_redis
 
 logger = logging.getLogger(__name__)
 
@@ -21,13 +26,12 @@ class IntentRequest(BaseModel):
     text: str
     user_id: Optional[str] = "mobile_user"
     
-    class Config:
-        json_schema_extra = {
-            "example": {
-                "text": "Turn on the bedroom lights",
-                "user_id": "user_123"
-            }
+    model_config = ConfigDict(json_schema_extra={
+        "example": {
+            "text": "Turn on the bedroom lights",
+            "user_id": "user_123"
         }
+    })
 
 
 class IntentResponse(BaseModel):
@@ -38,20 +42,55 @@ class IntentResponse(BaseModel):
     time: Optional[str] = None  # For REMINDER intent - extracted time information
     
 
-class IntentClassifierService:
-    """Simple intent classification service"""
-    
-    def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-        self.model = "gpt-4o-mini"
-    
-    async def classify_intent(self, text: str) -> dict:
-        """
-        Classify user intent using GPT-4o-mini
-        
-        Returns dict with intent, confidence
-        """
-        system_prompt = """You are an intent classifier. Analyze the user query and classify it into ONE of these intents:
+INTENT_MODEL = "gpt-4o-mini"
+
+# Example queries per intent, shared by the /examples endpoint and the prompt
+INTENT_EXAMPLES = {
+    "DEVICE_ACTION": [
+        "Turn on the bedroom lights",
+        "Set thermostat to 72 degrees", 
+        "Turn off the TV",
+        "Dim the living room lights"
+    ],
+    "REMINDER": [
+        "Set alarm for 7 AM",
+        "Remind me to call mom at 5pm",
+        "Wake me up in 30 minutes",
+        "Set a timer for 10 minutes"
+    ],
+    "MATH_CALC": [
+        "What is 25 * 8?",
+        "Calculate 15% of 200",
+        "What's 144 / 12?",
+        "Square root of 64"
+    ],
+    "SIMPLE_QA": [
+        "What is Python?",
+        "Define machine learning",
+        "Capital of France",
+        "How many ounces in a pound?"
+    ],
+    "COMPLEX_QA": [
+        "What's the weather today?",
+        "Latest news about AI",
+        "Current stock prices", 
+        "What's happening in sports?"
+    ],
+    "MEMORY": [
+        "Remember that I like coffee",
+        "Save my doctor's phone number",
+        "What's my favorite restaurant?",
+        "Store this information"
+    ],
+    "IMAGE_EDIT": [
+        "Edit this photo",
+        "Apply filter to image",
+        "Remove background from picture",
+        "Enhance image quality"
+    ]
+}
+
+INTENT_SYSTEM_PROMPT = """You are an intent classifier. Analyze the user query and classify it into ONE of these intents:
 
 DEVICE_ACTION - Control devices (lights, thermostat, TV, etc.)
 REMINDER - Set reminders, alarms, schedule tasks  
@@ -64,7 +103,7 @@ UNKNOWN - Cannot determine intent
 
 For REMINDER intent, also extract the time/date information.
 
-Respond ONLY with JSON format:
+Respond ONLY with JSON format, using at most 30 tokens:
 {
   "intent": "REMINDER", 
   "confidence": 0.95,
@@ -75,36 +114,168 @@ For non-REMINDER intents:
 {
   "intent": "DEVICE_ACTION", 
   "confidence": 0.95
-}"""
-
-        user_prompt = f'Classify this query: "{text}"'
-
-        try:
-            response = await self.client.chat.completions.create(
-                model=self.model,
-                messages=[
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                temperature=0.1,
-                max_tokens=100,
-                response_format={"type": "json_object"}
-            )
-            
-            result = json.loads(response.choices[0].message.content)
-            return result
-            
-        except Exception as e:
-            logger.error(f"Classification error: {e}")
-            return {"intent": "UNKNOWN", "confidence": 0.0}
-
-
-# Global service instance
-intent_service = IntentClassifierService()
+}
+
+Examples:
+""" + "\n".join(
+    f'"{example}" -> {intent}'
+    for intent, examples in INTENT_EXAMPLES.items()
+    for example in examples
+)
+
+
+INTENT_CACHE_SIZE = 4096
+INTENT_CACHE_TTL = 86400  # seconds
+
+# In-process LRU in front of Redis, keyed by normalized-text hash
+_intent_cache: "OrderedDict[str, dict]" = OrderedDict()
+
+
+def _intent_cache_key(text: str) -> str:
+    """Build cache key from normalized query text"""
+    norm = text.strip().lower()
+    return "intent:" + hashlib.blake2b(norm.encode(), digest_size=16).hexdigest()
+
+
+def _local_cache_get(key: str) -> Optional[dict]:
+    result = _intent_cache.get(key)
+    if result is not None:
+        _intent_cache.move_to_end(key)
+    return result
+
+
+def _local_cache_set(key: str, result: dict):
+    _intent_cache[key] = result
+    _intent_cache.move_to_end(key)
+    if len(_intent_cache) > INTENT_CACHE_SIZE:
+        _intent_cache.popitem(last=False)
+
+
+def _is_classification(result: Any) -> bool:
+    """Check that an LLM reply is a classification object with a string intent"""
+    return isinstance(result, dict) and isinstance(result.get("intent"), str)
+
+
+async def classify_intent(text: str, client: Optional[AsyncOpenAI] = None) -> dict:
+    """
+    Classify user intent using GPT-4o-mini
+    
+    Checks the in-process LRU, then Redis, before calling OpenAI.
+    
+    Returns dict with intent, confidence
+    """
+    key = _intent_cache_key(text)
+    
+    result = _local_cache_get(key)
+    if result is not None:
+        return result
+    
+    redis = get_redis()
+    try:
+        cached = await redis.get(key)
+        if cached:
+            result = orjson.loads(cached)
+            if _is_classification(result):
+                _local_cache_set(key, result)
+                return result
+    except Exception as e:
+        logger.warning("Intent cache read error: %s", e)
+    
+    try:
+        result = await intent_batcher.submit((text, client or get_openai()))
+    except Exception as e:
+        logger.error("Classification error: %s", e)
+        return {"intent": "UNKNOWN", "confidence": 0.0}
+    
+    if not _is_classification(result):
+        return {"intent": "UNKNOWN", "confidence": 0.0}
+    
+    _local_cache_set(key, result)
+    try:
+        await redis.setex(key, INTENT_CACHE_TTL, orjson.dumps(result))
+    except Exception as e:
+        logger.warning("Intent cache write error: %s", e)
+    
+    return result
+
+
+async def _classify_with_llm(text: str, client: AsyncOpenAI) -> dict:
+    """Call OpenAI to classify a single query"""
+    user_prompt = f'Classify this query: "{text}"'
+
+    response = await client.chat.completions.create(
+        model=INTENT_MODEL,
+        messages=[
+            {"role": "system", "content": INTENT_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ],
+        temperature=0.1,
+        max_tokens=40,
+        response_format={"type": "json_object"}
+    )
+    
+    result = orjson.loads(response.choices[0].message.content)
+    if not _is_classification(result):
+        raise ValueError(f"Classification returned no intent: {result!r}")
+    return result
+
+
+async def _classify_batch_with_llm(texts: List[str], client: AsyncOpenAI) -> List[dict]:
+    """Call OpenAI once to classify several queries, results in input order"""
+    user_prompt = (
+        "Classify each query in this JSON array independently. "
+        'Respond with {"results": [...]} holding one classification object per query, in the same order:\n'
+        + orjson.dumps(texts).decode()
+    )
+
+    response = await client.chat.completions.create(
+        model=INTENT_MODEL,
+        messages=[
+            {"role": "system", "content": INTENT_SYSTEM_PROMPT},
+            {"role": "user", "content": user_prompt}
+        ],
+        temperature=0.1,
+        max_tokens=40 * len(texts),
+        response_format={"type": "json_object"}
+    )
+    
+    results = orjson.loads(response.choices[0].message.content).get("results")
+    if not isinstance(results, list) or len(results) != len(texts):
+        raise ValueError(f"Batch classification returned {len(results or [])} results for {len(texts)} queries")
+    if not all(_is_classification(result) for result in results):
+        raise ValueError("Batch classification returned items without an intent")
+    return results
+
+
+async def _classify_batch(items: List[Tuple[str, AsyncOpenAI]]) -> List[Any]:
+    """
+    Classify one batch of (text, client) pairs
+    
+    A lone query is sent as a normal single-query call; a failed batch call
+    is retried per query.
+    """
+    texts = [text for text, _ in items]
+    client = items[0][1]
+    
+    if len(items) == 1:
+        return [await _classify_with_llm(texts[0], client)]
+    
+    try:
+        return await _classify_batch_with_llm(texts, client)
+    except Exception as e:
+        logger.warning("Batch classification failed, retrying individually: %s", e)
+        return await asyncio.gather(
+            *(_classify_with_llm(text, client) for text in texts),
+            return_exceptions=True
+        )
+
+
+# Process-wide batcher: requests arriving within 10 ms share one OpenAI call
+intent_batcher = MicroBatcher(_classify_batch, max_size=8, max_wait=0.01)
 
 
 @router.post("/classify", response_model=IntentResponse)
-async def classify_intent(request: IntentRequest):
+async def classify(request: IntentRequest, client: AsyncOpenAI = Depends(get_openai)):
     """
     Classify user intent for mobile app routing with time extraction
     
@@ -122,9 +293,9 @@ async def classify_intent(request: IntentRequest):
     - "What's the weather?" → COMPLEX_QA
     """
     try:
-        logger.info(f"🔍 Classifying intent: {request.text}")
+        logger.info("🔍 Classifying intent: %s", request.text)
         
-        result = await intent_service.classify_intent(request.text)
+        result = await classify_intent(request.text, client)
         
         response = IntentResponse(
             success=True,
@@ -133,12 +304,15 @@ async def classify_intent(request: IntentRequest):
             time=result.get("time") if result.get("intent") == "REMINDER" else None
         )
         
-        logger.info(f"✅ Intent: {response.intent} (confidence: {response.confidence:.2f})" + 
-                   (f" | Time: {response.time}" if response.time else ""))
+        logger.info(
+            "✅ Intent: %s (confidence: %.2f)%s",
+            response.intent, response.confidence,
+            f" | Time: {response.time}" if response.time else ""
+        )
         return response
         
     except Exception as e:
-        logger.error(f"❌ Intent classification failed: {e}")
+        logger.error("❌ Intent classification failed: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -148,50 +322,7 @@ async def get_intent_examples():
     Get example queries for each intent type
     """
     return {
-        "intent_examples": {
-            "DEVICE_ACTION": [
-                "Turn on the bedroom lights",
-                "Set thermostat to 72 degrees", 
-                "Turn off the TV",
-                "Dim the living room lights"
-            ],
-            "REMINDER": [
-                "Set alarm for 7 AM",
-                "Remind me to call mom at 5pm",
-                "Wake me up in 30 minutes",
-                "Set a timer for 10 minutes"
-            ],
-            "MATH_CALC": [
-                "What is 25 * 8?",
-                "Calculate 15% of 200",
-                "What's 144 / 12?",
-                "Square root of 64"
-            ],
-            "SIMPLE_QA": [
-                "What is Python?",
-                "Define machine learning",
-                "Capital of France",
-                "How many ounces in a pound?"
-            ],
-            "COMPLEX_QA": [
-                "What's the weather today?",
-                "Latest news about AI",
-                "Current stock prices", 
-                "What's happening in sports?"
-            ],
-            "MEMORY": [
-                "Remember that I like coffee",
-                "Save my doctor's phone number",
-                "What's my favorite restaurant?",
-                "Store this information"
-            ],
-            "IMAGE_EDIT": [
-                "Edit this photo",
-                "Apply filter to image",
-                "Remove background from picture",
-                "Enhance image quality"
-            ]
-        },
+        "intent_examples": INTENT_EXAMPLES,
         "usage": {
             "endpoint": "POST /api/intent/classify",
             "mobile_flow": [
@@ -205,13 +336,13 @@ async def get_intent_examples():
 
 
 @router.get("/health")
-async def intent_health():
+async def intent_health(client: AsyncOpenAI = Depends(get_openai)):
     """Health check for intent classification"""
     try:
-        test_result = await intent_service.classify_intent("Turn on lights")
+        test_result = await classify_intent("Turn on lights", client)
         return {
             "status": "healthy",
-            "model": "gpt-4o-mini",
+            "model": INTENT_MODEL,
             "test_intent": test_result.get("intent"),
             "test_confidence": test_result.get("confidence")
         }
@@ -1,66 +1,48 @@
 """
 User Management Router
 """
-from fastapi import APIRouter, HTTPException
-import logging
-from typing import Optional
+from fastapi import APIRouter, HTTPException, Depends, Request
 
-from app.core.database import get_database
-from app.models.schemas import UserPreferences
-
-logger = logging.getLogger(__name__)
+from app.services.orchestrator import orchestrator
 
 router = APIRouter()
 
 
+def get_users_collection(request: Request):
+    """Users collection handle bound at startup"""
+    return request.app.state.users
+
+
+def get_preferences_collection(request: Request):
+    """User preferences collection handle bound at startup"""
+    return request.app.state.user_preferences
+
+
 @router.get("/{user_id}")
-async def get_user(user_id: str):
+async def get_user(user_id: str, users=Depends(get_users_collection)):
     """Get user details"""
-    try:
-        db = get_database()
-        user = await db.users.find_one({"user_id": user_id})
-        
-        if not user:
-            return {"error": "User not found"}
-        
-        return user
-        
-    except Exception as e:
-        logger.error(f"❌ Error fetching user: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    user = await users.find_one({"user_id": user_id}, projection={"_id": 0})
+    
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    
+    return user
 
 
 @router.post("/{user_id}/preferences")
 async def update_preferences(user_id: str, preferences: dict):
-    """Update user preferences"""
-    try:
-        db = get_database()
-        
-        await db.user_preferences.update_one(
-            {"user_id": user_id},
-            {"$set": preferences},
-            upsert=True
-        )
-        
-        return {"success": True, "message": "Preferences updated"}
-        
-    except Exception as e:
-        logger.error(f"❌ Error updating preferences: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    """Update user preferences (through MemoryService, which caches them)"""
+    await orchestrator.memory_service.update_user_preferences(user_id, preferences)
+    
+    return {"success": True, "message": "Preferences updated"}
 
 
 @router.get("/{user_id}/preferences")
-async def get_preferences(user_id: str):
+async def get_preferences(user_id: str, user_preferences=Depends(get_preferences_collection)):
     """Get user preferences"""
-    try:
-        db = get_database()
-        prefs = await db.user_preferences.find_one({"user_id": user_id})
-        
-        if not prefs:
-            return {"user_id": user_id, "preferences": {}}
-        
-        return prefs
-        
-    except Exception as e:
-        logger.error(f"❌ Error fetching preferences: {e}")
-        raise HTTPException(status_code=500, detail=str(e))
+    prefs = await user_preferences.find_one({"user_id": user_id}, projection={"_id": 0})
+    
+    if not prefs:
+        return {"user_id": user_id, "preferences": {}}
+    
+    return prefs
@@ -5,8 +5,9 @@ Handles streaming voice conversations with real-time processing
 from fastapi import APIRouter, HTTPException, WebSocket, WebSocketDisconnect
 from fastapi.responses import StreamingResponse
 import logging
-import json
+import orjson
 import asyncio
+import base64
 from typing import AsyncGenerator
 
 from app.models.schemas import ConversationRequest, ConversationResponse
@@ -23,6 +24,34 @@ tts_service = TTSService()
 # Use the singleton chatgpt_direct_service from chatgpt_direct module
 chat_service = chatgpt_direct_service
 
+# Only tell the client a stage is running if it hasn't finished by then
+STATUS_DELAY = 0.5  # seconds
+
+
+async def _send_json(websocket: WebSocket, payload: dict):
+    """Send a JSON text frame encoded with orjson (binary frames carry audio)"""
+    await websocket.send_text(orjson.dumps(payload).decode())
+
+
+async def _await_with_status(websocket: WebSocket, awaitable, message: str):
+    """
+    Await a pipeline stage, sending a status frame only if it is slow
+    
+    Fast stages go straight to their result frame, saving a WebSocket write.
+    """
+    task = asyncio.ensure_future(awaitable)
+    try:
+        done, _ = await asyncio.wait({task}, timeout=STATUS_DELAY)
+        if not done:
+            await _send_json(websocket, {
+                "type": "status",
+                "message": message
+            })
+        return await task
+    finally:
+        if not task.done():
+            task.cancel()
+
 
 @router.post("/voice/process", response_model=ConversationResponse)
 async def process_voice_message(request: ConversationRequest):
@@ -37,16 +66,16 @@ async def process_voice_message(request: ConversationRequest):
     4. Return both text and audio
     """
     try:
-        logger.info(f"🎙️ Voice message from user: {request.user_id}")
+        logger.info("🎙️ Voice message from user: %s", request.user_id)
         
         # Process through orchestrator
         response = await orchestrator.process_conversation(request)
         
-        logger.info(f"✅ Voice response generated")
+        logger.info("✅ Voice response generated")
         return response
         
     except Exception as e:
-        logger.error(f"❌ Voice processing error: {e}", exc_info=True)
+        logger.error("❌ Voice processing error: %s", e, exc_info=True)
         raise HTTPException(status_code=500, detail=str(e))
 
 
@@ -55,111 +84,108 @@ async def voice_stream(websocket: WebSocket):
     """
     WebSocket endpoint for real-time voice streaming
     
-    Client sends: Audio chunks as base64
+    Client sends:
+      - Audio as binary frames (raw bytes, preferred)
+      - Control messages as JSON text frames
     Server sends: 
       - Transcription updates (as user speaks)
+      - Response audio (TTS), one JSON metadata frame followed by a
+        binary frame of raw audio per sentence as it is generated
       - Final response text
-      - Response audio (TTS)
     
-    Message format:
+    Control message format:
     {
-        "type": "audio_chunk" | "audio_end" | "message",
-        "data": "<base64_audio>" | "<text>",
+        "type": "audio_chunk" | "audio_end" | "ping",
+        "data": "<base64_audio>",  # audio_chunk only, legacy clients
         "user_id": "user_id"
     }
     """
     await websocket.accept()
     logger.info("🔌 WebSocket connection established")
     
-    audio_chunks = []
+    audio_buf = bytearray()
+    chunks_count = 0
     user_id = None
     
     try:
         while True:
             # Receive message from client
-            data = await websocket.receive_json()
+            message = await websocket.receive()
+            if message["type"] == "websocket.disconnect":
+                raise WebSocketDisconnect(message.get("code", 1000))
+            
+            if message.get("bytes") is not None:
+                # Raw audio frame
+                audio_buf.extend(message["bytes"])
+                chunks_count += 1
+                await _send_json(websocket, {
+                    "type": "chunk_received",
+                    "chunks_count": chunks_count
+                })
+                continue
+            
+            data = orjson.loads(message["text"])
             msg_type = data.get("type")
+            user_id = data.get("user_id") or user_id
             
             if msg_type == "audio_chunk":
-                # Store audio chunk for later processing
-                audio_chunks.append(data.get("data"))
-                user_id = data.get("user_id")
+                # Legacy base64 audio chunk
+                audio_buf.extend(base64.b64decode(data.get("data", "")))
+                chunks_count += 1
                 
                 # Send acknowledgment
-                await websocket.send_json({
+                await _send_json(websocket, {
                     "type": "chunk_received",
-                    "chunks_count": len(audio_chunks)
+                    "chunks_count": chunks_count
                 })
                 
             elif msg_type == "audio_end":
                 # User finished speaking, process the audio
-                logger.info(f"🎤 Processing {len(audio_chunks)} audio chunks")
+                logger.info("🎤 Processing %d audio chunks (%d bytes)", chunks_count, len(audio_buf))
                 
-                if not audio_chunks:
-                    await websocket.send_json({
+                if not audio_buf:
+                    await _send_json(websocket, {
                         "type": "error",
                         "message": "No audio data received"
                     })
                     continue
                 
-                # Combine audio chunks
-                combined_audio = "".join(audio_chunks)
-                audio_chunks = []  # Reset for next message
+                audio_bytes = bytes(audio_buf)
+                audio_buf.clear()  # Reset for next message
+                chunks_count = 0
                 
                 # Transcribe
-                await websocket.send_json({
-                    "type": "status",
-                    "message": "Transcribing..."
-                })
-                
-                transcription = await stt_service.speech_to_text(combined_audio)
+                transcription = await _await_with_status(
+                    websocket, stt_service.speech_to_text(audio_bytes), "Transcribing..."
+                )
                 
-                await websocket.send_json({
+                # The transcription frame doubles as the "thinking" status
+                await _send_json(websocket, {
                     "type": "transcription",
-                    "text": transcription
+                    "text": transcription,
+                    "stage": "thinking"
                 })
                 
                 # Generate response
-                await websocket.send_json({
-                    "type": "status",
-                    "message": "Thinking..."
-                })
-                
-                response_text = await chat_service.generate_response(
-                    user_id=user_id or "anonymous",
-                    message=transcription,
-                    web_search=False
+                response_text = await _stream_spoken_response(
+                    websocket, user_id or "anonymous", transcription
                 )
                 
-                await websocket.send_json({
+                await _send_json(websocket, {
                     "type": "response_text",
                     "text": response_text
                 })
                 
-                # Generate TTS
-                await websocket.send_json({
-                    "type": "status",
-                    "message": "Speaking..."
-                })
-                
-                audio_base64 = await tts_service.text_to_speech(response_text)
-                
-                await websocket.send_json({
-                    "type": "response_audio",
-                    "audio": audio_base64,
-                    "text": response_text
-                })
-                
-                await websocket.send_json({
+                await _send_json(websocket, {
                     "type": "complete",
                     "message": "Ready for next message"
                 })
                 
             elif msg_type == "ping":
-                await websocket.send_json({"type": "pong"})
+                await _send_json(websocket, {"type": "pong"})
                 
             else:
-                await websocket.send_json({
+                await _send_json(websocket, {
                     "type": "error",
                     "message": f"Unknown message type: {msg_type}"
                 })
@@ -167,9 +193,9 @@ async def voice_stream(websocket: WebSocket):
     except WebSocketDisconnect:
         logger.info("🔌 WebSocket disconnected")
     except Exception as e:
-        logger.error(f"❌ WebSocket error: {e}", exc_info=True)
+        logger.error("❌ WebSocket error: %s", e, exc_info=True)
         try:
-            await websocket.send_json({
+            await _send_json(websocket, {
                 "type": "error",
                 "message": str(e)
             })
@@ -182,6 +208,53 @@ async def voice_stream(websocket: WebSocket):
             pass
 
 
+async def _stream_spoken_response(websocket: WebSocket, user_id: str, text: str) -> str:
+    """
+    Generate the reply and send its audio sentence by sentence
+    
+    The LLM stream and TTS run as a pipeline: each sentence's TTS starts as
+    soon as the sentence is complete, while the model keeps generating. A
+    small queue bounds how far generation runs ahead of delivery.
+    
+    Returns:
+        Full response text
+    """
+    audio_queue: asyncio.Queue = asyncio.Queue(maxsize=2)
+    
+    async def produce() -> str:
+        sentences = []
+        try:
+            async for sentence in chat_service.stream_response(
+                user_id=user_id,
+                text=text,
+                use_web_search=False
+            ):
+                sentences.append(sentence)
+                await audio_queue.put(
+                    (sentence, asyncio.create_task(tts_service.text_to_speech(sentence)))
+                )
+        finally:
+            await audio_queue.put(None)
+        return " ".join(sentences)
+    
+    producer = asyncio.create_task(produce())
+    try:
+        while (item := await audio_queue.get()) is not None:
+            sentence, tts_task = item
+            audio = await tts_task
+            await _send_json(websocket, {
+                "type": "response_audio_chunk",
+                "text": sentence,
+                "size": len(audio),
+                "mime_type": tts_service.mime_type(sentence)
+            })
+            if audio:
+                await websocket.send_bytes(audio)
+        return await producer
+    finally:
+        producer.cancel()
+
+
 @router.post("/voice/streaming-transcribe")
 async def streaming_transcribe(request: ConversationRequest):
     """
@@ -194,23 +267,28 @@ async def streaming_transcribe(request: ConversationRequest):
         try:
             # This is a simplified version - for real streaming,
             # you'd need to process audio chunks as they arrive
-            yield f"data: {json.dumps({'type': 'status', 'message': 'Processing audio...'})}\n\n"
+            yield f"data: {orjson.dumps({'type': 'status', 'message': 'Processing audio...'}).decode()}\n\n"
             
-            # Transcribe
-            transcription = await stt_service.speech_to_text(request.audio_base64)
-            yield f"data: {json.dumps({'type': 'transcription', 'text': transcription})}\n\n"
+            # Transcribe (text requests skip STT)
+            if request.text:
+                transcription = request.text
+            else:
+                transcription = await stt_service.speech_to_text(base64.b64decode(request.audio or ""))
+            yield f"data: {orjson.dumps({'type': 'transcription', 'text': transcription}).decode()}\n\n"
             
-            # Generate response
-            yield f"data: {json.dumps({'type': 'status', 'message': 'Generating response...'})}\n\n"
+            # Generate response from the transcription so the audio isn't transcribed twice
+            yield f"data: {orjson.dumps({'type': 'status', 'message': 'Generating response...'}).decode()}\n\n"
             
-            response = await orchestrator.process_conversation(request)
+            response = await orchestrator.process_conversation(
+                request.model_copy(update={"text": transcription, "audio": None})
+            )
             
-            yield f"data: {json.dumps({'type': 'response', 'data': response.dict()})}\n\n"
-            yield f"data: {json.dumps({'type': 'complete'})}\n\n"
+            yield f"data: {orjson.dumps({'type': 'response', 'data': response.dict()}).decode()}\n\n"
+            yield f"data: {orjson.dumps({'type': 'complete'}).decode()}\n\n"
             
         except Exception as e:
-            logger.error(f"Streaming error: {e}")
-            yield f"data: {json.dumps({'type': 'error', 'message': str(e)})}\n\n"
+            logger.error("Streaming error: %s", e)
+            yield f"data: {orjson.dumps({'type': 'error', 'message': str(e)}).decode()}\n\n"
     
     return StreamingResponse(
         generate(),
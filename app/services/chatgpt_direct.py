@@ -1,20 +1,70 @@
 """
 Direct ChatGPT Service - Sends requests directly to ChatGPT without intent parsing
 """
+import asyncio
+import hashlib
 import logging
-from typing import Dict, Any, Optional, List
-from datetime import datetime
-from openai import AsyncOpenAI
+import re
+import orjson
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from cachetools import TTLCache
+from typing import Dict, Any, Optional, List, AsyncIterator
+from datetime import date
 
 from app.core.config import settings
+from app.core.openai_client import get_openai
+from app.core.redis_client import get_redis
 
 logger = logging.getLogger(__name__)
 
+# Static part of the system prompt; only the date line changes (daily)
+_SYSTEM_PREFIX = """You are JARVIS, an intelligent AI assistant created to help users with various tasks.
+You are helpful, conversational, and knowledgeable. 
+- For news requests, provide current, relevant information from the search results
+- For general questions, give accurate and concise answers
+- For tasks like alarms or reminders, acknowledge the request conversationally
+- Keep responses natural and friendly
+- Current date: """
+
+_WEB_SEARCH_SUFFIX = "\n\nYou have access to real-time web search results below. Use this information to provide accurate, up-to-date answers."
+
+# Conversation history lives in Redis so it is shared across workers
+HISTORY_MAX_MESSAGES = 20  # 10 exchanges, to avoid token limits
+HISTORY_CONTEXT_MESSAGES = 10
+HISTORY_TTL = 86400  # seconds
+
+WEB_SEARCH_TIMEOUT = 2.0  # seconds
+
+# Repeat searches ("news today", "weather") are served from memory
+SEARCH_CACHE_SIZE = 1024
+SEARCH_CACHE_TTL = 120  # seconds
+
+# Cap on concurrent completions so bursts queue locally instead of
+# exhausting the shared connection pool or tripping rate limits
+MAX_CONCURRENT_COMPLETIONS = 32
+
+# Completed replies are reused briefly for duplicate requests (double taps, retries)
+RESPONSE_CACHE_SIZE = 1024
+RESPONSE_CACHE_TTL = 60  # seconds
+
+# Queries mentioning any of these need real-time information
+_WEB_SEARCH_RE = re.compile(
+    r"\b(?:news|today|latest|current|recent|weather|happening|now|update|"
+    r"what is|who is|stock|price|score|match|game|event)\b",
+    re.IGNORECASE
+)
+
+# Sentence boundary: terminal punctuation followed by whitespace
+_SENTENCE_END_RE = re.compile(r"(?<=[.!?])\s+")
+
 # Import Tavily if web search is enabled
 if settings.ENABLE_WEB_SEARCH and settings.WEB_SEARCH_API_KEY:
     try:
         from tavily import TavilyClient
         tavily_client = TavilyClient(api_key=settings.WEB_SEARCH_API_KEY)
+        # Dedicated threads so search bursts can't starve other executor work
+        _search_pool = ThreadPoolExecutor(max_workers=8, thread_name_prefix="tavily")
         WEB_SEARCH_AVAILABLE = True
         logger.info("✅ Web search enabled with Tavily")
     except ImportError:
@@ -31,8 +81,14 @@ class ChatGPTDirectService:
     """
     
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
-        self.conversation_history: Dict[str, List[Dict]] = {}
+        self.client = get_openai()
+        self._cached_date: Optional[date] = None
+        self._cached_system: Dict[bool, Dict[str, str]] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self._completion_slots = asyncio.Semaphore(MAX_CONCURRENT_COMPLETIONS)
+        self._search_cache: TTLCache = TTLCache(maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL)
+        self._search_locks: Dict[str, asyncio.Lock] = {}
+        self._recent_responses = TTLCache(maxsize=RESPONSE_CACHE_SIZE, ttl=RESPONSE_CACHE_TTL)
     
     async def process_request(
         self,
@@ -53,6 +109,54 @@ class ChatGPTDirectService:
         Returns:
             Dict with status and response
         """
+        key = hashlib.blake2b(
+            f"{user_id}|{include_context}|{use_web_search}|{text}".encode(),
+            digest_size=16
+        ).hexdigest()
+        
+        cached = self._recent_responses.get(key)
+        if cached is not None:
+            return cached
+        
+        # Identical request already running: share its result
+        inflight = self._inflight.get(key)
+        if inflight is not None:
+            try:
+                return await asyncio.shield(inflight)
+            except asyncio.CancelledError:
+                # The leader was cancelled (e.g. its client disconnected);
+                # unless this task was cancelled too, take the request over
+                if not inflight.cancelled() or asyncio.current_task().cancelling():
+                    raise
+                return await self.process_request(user_id, text, include_context, use_web_search)
+        
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            result = await self._process_request(user_id, text, include_context, use_web_search)
+            future.set_result(result)
+            if result["status"] == "success":
+                self._recent_responses[key] = result
+            return result
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            future.set_exception(e)
+            # Avoid "exception was never retrieved" when nobody else waited
+            future.exception()
+            raise
+        finally:
+            del self._inflight[key]
+    
+    async def _process_request(
+        self,
+        user_id: str,
+        text: str,
+        include_context: bool,
+        use_web_search: bool
+    ) -> Dict[str, Any]:
+        """Call ChatGPT for a single (non-deduplicated) request"""
         try:
             logger.info(f"🤖 Processing direct ChatGPT request from user {user_id}: {text}")
             
@@ -62,21 +166,22 @@ class ChatGPTDirectService:
                 web_search_results = await self._perform_web_search(text)
             
             # Get conversation history if enabled
-            messages = self._build_messages(user_id, text, include_context, web_search_results)
+            messages = await self._build_messages(user_id, text, include_context, web_search_results)
             
             # Call ChatGPT
-            response = await self.client.chat.completions.create(
-                model=settings.DEFAULT_LLM_MODEL,
-                messages=messages,
-                temperature=0.7,
-                max_tokens=800
-            )
+            async with self._completion_slots:
+                response = await self.client.chat.completions.create(
+                    model=settings.DEFAULT_LLM_MODEL,
+                    messages=messages,
+                    temperature=0.7,
+                    max_tokens=800
+                )
             
             assistant_response = response.choices[0].message.content
             
             # Store conversation in history
             if include_context:
-                self._update_conversation_history(user_id, text, assistant_response)
+                await self._update_conversation_history(user_id, text, assistant_response)
             
             logger.info(f"✅ ChatGPT response: {assistant_response[:100]}...")
             
@@ -96,46 +201,133 @@ class ChatGPTDirectService:
                 "error": str(e)
             }
     
+    async def stream_response(
+        self,
+        user_id: str,
+        text: str,
+        include_context: bool = True,
+        use_web_search: bool = True
+    ) -> AsyncIterator[str]:
+        """
+        Stream ChatGPT's reply sentence by sentence
+        
+        Args:
+            user_id: User identifier
+            text: User's text input
+            include_context: Whether to include conversation history
+            use_web_search: Whether to use web search for real-time info
+            
+        Yields:
+            Each complete sentence as soon as the model finishes it
+        """
+        web_search_results = None
+        if use_web_search and WEB_SEARCH_AVAILABLE and self._should_use_web_search(text):
+            web_search_results = await self._perform_web_search(text)
+        
+        messages = await self._build_messages(user_id, text, include_context, web_search_results)
+        
+        async with self._completion_slots:
+            stream = await self.client.chat.completions.create(
+                model=settings.DEFAULT_LLM_MODEL,
+                messages=messages,
+                temperature=0.7,
+                max_tokens=800,
+                stream=True
+            )
+        
+            buffer = ""
+            sentences = []
+            async for chunk in stream:
+                if not chunk.choices:
+                    continue
+                delta = chunk.choices[0].delta.content
+                if not delta:
+                    continue
+            
+                buffer += delta
+                *complete, buffer = _SENTENCE_END_RE.split(buffer)
+                for sentence in complete:
+                    sentence = sentence.strip()
+                    if sentence:
+                        sentences.append(sentence)
+                        yield sentence
+        
+        tail = buffer.strip()
+        if tail:
+            sentences.append(tail)
+            yield tail
+        
+        if include_context:
+            await self._update_conversation_history(user_id, text, " ".join(sentences))
+    
     def _should_use_web_search(self, text: str) -> bool:
         """Determine if web search should be used based on query"""
-        search_keywords = [
-            'news', 'today', 'latest', 'current', 'recent', 'weather',
-            'happening', 'now', 'update', 'what is', 'who is', 'stock',
-            'price', 'score', 'match', 'game', 'event'
-        ]
-        text_lower = text.lower()
-        return any(keyword in text_lower for keyword in search_keywords)
+        return _WEB_SEARCH_RE.search(text) is not None
     
     async def _perform_web_search(self, query: str) -> Optional[str]:
-        """Perform web search using Tavily"""
+        """
+        Perform web search using Tavily, with a short-lived cache
+        
+        Concurrent misses for the same query wait on one Tavily call.
+        """
+        key = query.strip().lower()[:128]
+        cached = self._search_cache.get(key)
+        if cached is not None:
+            logger.info(f"⚡ Web search cache hit for: {query}")
+            return cached
+        
+        lock = self._search_locks.setdefault(key, asyncio.Lock())
+        try:
+            async with lock:
+                cached = self._search_cache.get(key)
+                if cached is not None:
+                    return cached
+                
+                results_text = await self._search_tavily(query)
+                if results_text is not None:
+                    self._search_cache[key] = results_text
+                return results_text
+        finally:
+            # Waiters already hold a reference to the lock
+            if self._search_locks.get(key) is lock:
+                del self._search_locks[key]
+    
+    async def _search_tavily(self, query: str) -> Optional[str]:
+        """Run the Tavily search and format the results"""
         try:
             logger.info(f"🔍 Performing web search for: {query}")
             
-            # Use Tavily search
-            search_result = tavily_client.search(
-                query=query,
-                search_depth="basic",
-                max_results=3
+            # Tavily's client is blocking, run it on its own bounded pool
+            search_result = await asyncio.wait_for(
+                asyncio.get_running_loop().run_in_executor(
+                    _search_pool,
+                    partial(tavily_client.search, query=query, search_depth="basic", max_results=3)
+                ),
+                timeout=WEB_SEARCH_TIMEOUT
             )
             
             # Format results
-            if search_result and 'results' in search_result:
-                results_text = "\n\n--- Web Search Results ---\n"
-                for i, result in enumerate(search_result['results'][:3], 1):
-                    results_text += f"\n{i}. {result.get('title', 'N/A')}\n"
-                    results_text += f"   {result.get('content', 'N/A')[:200]}...\n"
-                    results_text += f"   Source: {result.get('url', 'N/A')}\n"
+            results = (search_result or {}).get('results')
+            if results is not None:
+                parts = ["\n\n--- Web Search Results ---\n"]
+                for i, result in enumerate(results[:3], 1):
+                    parts.append(f"\n{i}. {result.get('title', 'N/A')}\n")
+                    parts.append(f"   {result.get('content', 'N/A')[:200]}...\n")
+                    parts.append(f"   Source: {result.get('url', 'N/A')}\n")
                 
-                logger.info(f"✅ Found {len(search_result['results'])} search results")
-                return results_text
+                logger.info(f"✅ Found {len(results)} search results")
+                return "".join(parts)
             
             return None
             
+        except asyncio.TimeoutError:
+            logger.warning(f"⚠️ Web search timed out after {WEB_SEARCH_TIMEOUT}s")
+            return None
         except Exception as e:
             logger.error(f"❌ Web search error: {e}")
             return None
     
-    def _build_messages(
+    async def _build_messages(
         self,
         user_id: str,
         text: str,
@@ -144,31 +336,13 @@ class ChatGPTDirectService:
     ) -> List[Dict[str, str]]:
         """Build messages array for ChatGPT API"""
         
-        # System message
-        system_content = """You are JARVIS, an intelligent AI assistant created to help users with various tasks.
-You are helpful, conversational, and knowledgeable. 
-- For news requests, provide current, relevant information from the search results
-- For general questions, give accurate and concise answers
-- For tasks like alarms or reminders, acknowledge the request conversationally
-- Keep responses natural and friendly
-- Current date: """ + datetime.now().strftime("%B %d, %Y")
-        
-        # Add web search instruction if results available
-        if web_search_results:
-            system_content += "\n\nYou have access to real-time web search results below. Use this information to provide accurate, up-to-date answers."
-        
-        system_message = {
-            "role": "system",
-            "content": system_content
-        }
-        
-        messages = [system_message]
+        # System message (static for the whole day, so it comes first)
+        messages = [self._get_system_message(web_search_results is not None)]
         
         # Add conversation history if enabled
-        if include_context and user_id in self.conversation_history:
+        if include_context:
             # Get last 5 exchanges to keep context manageable
-            recent_history = self.conversation_history[user_id][-10:]
-            messages.extend(recent_history)
+            messages.extend(await self._get_recent_history(user_id))
         
         # Add current user message with search results if available
         user_content = text
@@ -182,30 +356,57 @@ You are helpful, conversational, and knowledgeable.
         
         return messages
     
-    def _update_conversation_history(
+    def _get_system_message(self, has_search: bool) -> Dict[str, str]:
+        """Get the system message, rebuilt only when the date changes"""
+        today = date.today()
+        if self._cached_date != today:
+            base = _SYSTEM_PREFIX + today.strftime("%B %d, %Y")
+            self._cached_system = {
+                False: {"role": "system", "content": base},
+                True: {"role": "system", "content": base + _WEB_SEARCH_SUFFIX}
+            }
+            self._cached_date = today
+        return self._cached_system[has_search]
+    
+    async def _get_recent_history(self, user_id: str) -> List[Dict[str, str]]:
+        """Get the most recent history messages for user, oldest first"""
+        try:
+            raw = await get_redis().lrange(_history_key(user_id), 0, HISTORY_CONTEXT_MESSAGES - 1)
+            return [orjson.loads(item) for item in reversed(raw)]
+        except Exception as e:
+            logger.warning(f"⚠️ Could not load conversation history: {e}")
+            return []
+    
+    async def _update_conversation_history(
         self,
         user_id: str,
         user_text: str,
         assistant_response: str
     ):
         """Update conversation history for user"""
-        if user_id not in self.conversation_history:
-            self.conversation_history[user_id] = []
-        
-        self.conversation_history[user_id].extend([
-            {"role": "user", "content": user_text},
-            {"role": "assistant", "content": assistant_response}
-        ])
-        
-        # Keep only last 20 messages (10 exchanges) to avoid token limits
-        if len(self.conversation_history[user_id]) > 20:
-            self.conversation_history[user_id] = self.conversation_history[user_id][-20:]
+        key = _history_key(user_id)
+        try:
+            async with get_redis().pipeline(transaction=False) as pipe:
+                # Newest first: the assistant reply ends up at the head
+                pipe.lpush(
+                    key,
+                    orjson.dumps({"role": "user", "content": user_text}),
+                    orjson.dumps({"role": "assistant", "content": assistant_response})
+                )
+                pipe.ltrim(key, 0, HISTORY_MAX_MESSAGES - 1)
+                pipe.expire(key, HISTORY_TTL)
+                await pipe.execute()
+        except Exception as e:
+            logger.warning(f"⚠️ Could not store conversation history: {e}")
     
-    def clear_history(self, user_id: str):
+    async def clear_history(self, user_id: str):
         """Clear conversation history for a user"""
-        if user_id in self.conversation_history:
-            del self.conversation_history[user_id]
-            logger.info(f"🗑️ Cleared conversation history for user {user_id}")
+        await get_redis().delete(_history_key(user_id))
+        logger.info(f"🗑️ Cleared conversation history for user {user_id}")
+
+
+def _history_key(user_id: str) -> str:
+    return f"conv:{user_id}"
 
 
 # Singleton instance
@@ -5,8 +5,8 @@ import logging
 from typing import Dict, Any
 
 from app.models.schemas import Intent, IntentType
-from app.services.reminders import RemindersService
-from app.services.flights import FlightsService
+from app.services.reminders import get_reminders_service
+from app.services.flights import get_flights_service
 
 logger = logging.getLogger(__name__)
 
@@ -17,8 +17,14 @@ class CommandRouter:
     """
     
     def __init__(self):
-        self.reminders_service = RemindersService()
-        self.flights_service = FlightsService()
+        self.reminders_service = get_reminders_service()
+        self.flights_service = get_flights_service()
+        self._handlers = {
+            IntentType.SET_ALARM: self._handle_set_alarm,
+            IntentType.DELETE_ALARM: self._handle_delete_alarm,
+            IntentType.SEARCH_FLIGHTS: self._handle_search_flights,
+            IntentType.GET_WEATHER: self._handle_get_weather,
+        }
     
     async def route(
         self,
@@ -38,23 +44,14 @@ class CommandRouter:
             Result from action service
         """
         try:
-            if intent.intent == IntentType.SET_ALARM:
-                return await self._handle_set_alarm(intent, user_id, user_context)
-            
-            elif intent.intent == IntentType.DELETE_ALARM:
-                return await self._handle_delete_alarm(intent, user_id)
-            
-            elif intent.intent == IntentType.SEARCH_FLIGHTS:
-                return await self._handle_search_flights(intent, user_id, user_context)
-            
-            elif intent.intent == IntentType.GET_WEATHER:
-                return await self._handle_get_weather(intent, user_id)
-            
-            else:
+            handler = self._handlers.get(intent.intent)
+            if handler is None:
                 return {
                     "status": "unknown_intent",
                     "message": "I'm not sure how to help with that yet."
                 }
+            
+            return await handler(intent, user_id, user_context)
                 
         except Exception as e:
             logger.error(f"❌ Routing error: {e}", exc_info=True)
@@ -92,7 +89,8 @@ class CommandRouter:
     async def _handle_delete_alarm(
         self,
         intent: Intent,
-        user_id: str
+        user_id: str,
+        user_context: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Handle delete alarm command"""
         result = await self.reminders_service.delete_recent_alarm(user_id)
@@ -141,7 +139,8 @@ class CommandRouter:
     async def _handle_get_weather(
         self,
         intent: Intent,
-        user_id: str
+        user_id: str,
+        user_context: Dict[str, Any]
     ) -> Dict[str, Any]:
         """Handle weather query"""
         # TODO: Implement weather service
@@ -2,86 +2,218 @@
 Firebase Reminders Service - Handle Firebase Cloud Messaging for reminders
 """
 import logging
-import json
 from datetime import datetime, timedelta, timezone
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, Tuple
+from functools import lru_cache
 import asyncio
+import heapq
+import itertools
+import time
+from concurrent.futures import ThreadPoolExecutor
 from firebase_admin import credentials, messaging, initialize_app
 import firebase_admin
-from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.triggers.date import DateTrigger
-import os
+import orjson
+
+from app.core.batching import MicroBatcher
+from app.core.config import get_settings
+from app.services.reminder_store import ReminderStore
 
 logger = logging.getLogger(__name__)
 
+# FCM accepts at most 500 messages per send_each call
+FCM_MAX_BATCH = 500
+FCM_BATCH_WAIT = 0.5  # seconds
+FCM_SEND_WORKERS = 16
+
+REMINDER_TITLE = "🔔 JARVIS Reminder"
+
+
+@lru_cache(maxsize=1)
+def _get_fcm_pool() -> ThreadPoolExecutor:
+    """Bounded pool for the blocking messaging.send_each calls"""
+    return ThreadPoolExecutor(max_workers=FCM_SEND_WORKERS, thread_name_prefix="fcm")
+
+
+async def _send_each(messages: List[messaging.Message]) -> messaging.BatchResponse:
+    """Run messaging.send_each on the FCM pool (firebase-admin 6.6.0 has no async send)"""
+    return await asyncio.get_running_loop().run_in_executor(
+        _get_fcm_pool(), messaging.send_each, messages
+    )
+
+
+def _coalesce(messages: List[messaging.Message]) -> Tuple[List[messaging.Message], List[int]]:
+    """
+    Merge messages with the same token and body into one push
+    
+    Returns:
+        Unique messages, and for each input message the index of the
+        unique message that carries it
+    """
+    unique: List[messaging.Message] = []
+    slot_of: List[int] = []
+    slots: Dict[Tuple[str, str], int] = {}
+    merged_ids: Dict[int, List[str]] = {}
+    
+    for message in messages:
+        key = (message.token, message.notification.body if message.notification else None)
+        slot = slots.get(key)
+        if slot is None:
+            slot = slots[key] = len(unique)
+            unique.append(message)
+            merged_ids[slot] = [(message.data or {}).get("reminder_id", "")]
+        else:
+            merged_ids[slot].append((message.data or {}).get("reminder_id", ""))
+        slot_of.append(slot)
+    
+    for slot, ids in merged_ids.items():
+        if len(ids) > 1:
+            first = unique[slot]
+            unique[slot] = messaging.Message(
+                notification=first.notification,
+                data={**first.data, "reminder_ids": ",".join(ids)},
+                token=first.token
+            )
+    
+    return unique, slot_of
+
+
+async def _send_batch(messages: List[messaging.Message]) -> List[Any]:
+    """
+    Send notifications that fired together in one send_each call
+    
+    Returns:
+        The FCM message ID, or the send exception, per input message
+    """
+    unique, slot_of = _coalesce(messages)
+    try:
+        response = await _send_each(unique)
+    except Exception as e:
+        logger.error(f"❌ FCM batch error: {e}")
+        raise
+    
+    sent = [
+        r.message_id if r.success else r.exception
+        for r in response.responses
+    ]
+    logger.info(
+        f"📤 FCM batch sent: {response.success_count}/{len(unique)} delivered"
+        f" ({len(messages) - len(unique)} duplicates merged)"
+    )
+    return [sent[slot] for slot in slot_of]
+
 
 class FirebaseRemindersService:
     """Service to handle Firebase Cloud Messaging for reminders"""
     
     def __init__(self):
-        self.scheduler = None
-        self.devices = {}  # In-memory storage for demo (use database in production)
-        self.reminders = {}  # In-memory storage for demo (use database in production)
+        self.store = ReminderStore()
+        self.batcher = MicroBatcher(_send_batch, FCM_MAX_BATCH, FCM_BATCH_WAIT)
         self.firebase_app = None
         self.project_id = None
+        # Pending reminders as a min-heap of (fire_at, seq, reminder_id, reminder_data);
+        # fire_at is a Unix timestamp and seq breaks ties so dicts are never compared
+        self._heap: List[Tuple[float, int, str, Dict[str, Any]]] = []
+        self._seq = itertools.count()
+        # Live fire_at per reminder; heap entries that don't match are stale (lazy deletion)
+        self._scheduled: Dict[str, float] = {}
+        self._wake = asyncio.Event()
+        self._dispatcher: Optional[asyncio.Task] = None
+        self._sending: set = set()  # keep send tasks referenced until done
         self._initialize_firebase()
-        self._initialize_scheduler()
     
     def _initialize_firebase(self):
         """Initialize Firebase Admin SDK"""
+        if firebase_admin._apps:
+            self.firebase_app = firebase_admin.get_app()
+            logger.info("✅ Using existing Firebase Admin SDK instance")
+            return
+        
+        cred_info = self._load_firebase_credentials()
+        if cred_info is None:
+            logger.warning("⚠️ No Firebase credentials found. Firebase features will be disabled.")
+            return
+        
         try:
-            if not firebase_admin._apps:
-                # Try to load Firebase credentials from environment or file
-                cred_path = os.getenv('FIREBASE_CREDENTIALS_PATH', './app/jarvis-firebase-adminsdk.json')
-                
-                if os.path.exists(cred_path):
-                    logger.info(f"🔥 Loading Firebase credentials from {cred_path}")
-                    cred = credentials.Certificate(cred_path)
-                    self.firebase_app = initialize_app(cred)
-                    logger.info("✅ Firebase Admin SDK initialized successfully")
-                else:
-                    # Try environment variable with JSON
-                    cred_json = os.getenv('FIREBASE_CREDENTIALS_JSON')
-                    if cred_json:
-                        logger.info("🔥 Loading Firebase credentials from environment variable")
-                        cred_dict = json.loads(cred_json)
-                        cred = credentials.Certificate(cred_dict)
-                        self.firebase_app = initialize_app(cred)
-                        logger.info("✅ Firebase Admin SDK initialized successfully")
-                    else:
-                        logger.warning("⚠️ No Firebase credentials found. Firebase features will be disabled.")
-                        return
-                
-                # Get project ID
-                if hasattr(cred, 'project_id'):
-                    self.project_id = cred.project_id
-                elif cred_json:
-                    self.project_id = json.loads(cred_json).get('project_id')
-                else:
-                    self.project_id = os.getenv('FIREBASE_PROJECT_ID', 'jarvis-backend-dea61')
-                
-                logger.info(f"✅ Firebase initialized for project: {self.project_id}")
-                
-            else:
-                self.firebase_app = firebase_admin._apps[0]
-                logger.info("✅ Using existing Firebase Admin SDK instance")
-                
-        except Exception as e:
-            logger.error(f"❌ Failed to initialize Firebase: {e}")
-            self.firebase_app = None
-                
-        except Exception as e:
+            cred = credentials.Certificate(cred_info)
+            self.firebase_app = initialize_app(cred)
+        except ValueError as e:
             logger.error(f"❌ Failed to initialize Firebase: {e}")
             self.firebase_app = None
+            return
+        
+        logger.info("✅ Firebase Admin SDK initialized successfully")
+        
+        # Get project ID
+        self.project_id = cred.project_id or get_settings().FIREBASE_PROJECT_ID or 'jarvis-backend-dea61'
+        logger.info(f"✅ Firebase initialized for project: {self.project_id}")
+    
+    def _load_firebase_credentials(self) -> Optional[Dict[str, Any]]:
+        """Load the service account JSON from file, falling back to the environment"""
+        try:
+            return get_settings().firebase_credentials
+        except OSError as e:
+            logger.error(f"❌ Failed to read Firebase credentials: {e}")
+        except orjson.JSONDecodeError as e:
+            logger.error(f"❌ Invalid Firebase credentials: {e}")
+        return None
     
-    def _initialize_scheduler(self):
-        """Initialize the async scheduler for delayed notifications"""
+    def _ensure_dispatcher(self):
+        """Start the reminder dispatcher on first use"""
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = asyncio.create_task(self._dispatch_loop())
+            logger.info("✅ Firebase reminder dispatcher started")
+    
+    def _enqueue(self, reminder_id: str, fire_at: float, reminder_data: Dict[str, Any]):
+        """Push a reminder onto the heap, replacing any earlier schedule for its ID"""
+        self._scheduled[reminder_id] = fire_at
+        heapq.heappush(self._heap, (fire_at, next(self._seq), reminder_id, reminder_data))
+        self._ensure_dispatcher()
+        self._wake.set()
+    
+    async def restore_scheduled(self) -> int:
+        """
+        Rebuild the heap from reminders still scheduled in Redis
+        
+        Called at startup so reminders survive restarts; any that came due
+        while the server was down fire immediately.
+        
+        Returns:
+            Number of reminders restored
+        """
         try:
-            self.scheduler = AsyncIOScheduler()
-            self.scheduler.start()
-            logger.info("✅ Firebase scheduler initialized")
+            pending = await self.store.list_scheduled()
         except Exception as e:
-            logger.error(f"❌ Failed to initialize scheduler: {e}")
+            logger.error(f"❌ Failed to restore Firebase reminders: {e}")
+            return 0
+        
+        for reminder_data in pending:
+            fire_at = datetime.fromisoformat(reminder_data["scheduled_time"]).timestamp()
+            self._enqueue(reminder_data["reminder_id"], fire_at, reminder_data)
+        
+        if pending:
+            logger.info(f"✅ Restored {len(pending)} scheduled Firebase reminders")
+        return len(pending)
+    
+    async def _dispatch_loop(self):
+        """Sleep until the earliest reminder is due, then fire everything due"""
+        while True:
+            now = time.time()
+            while self._heap and self._heap[0][0] <= now:
+                fire_at, _, reminder_id, reminder_data = heapq.heappop(self._heap)
+                if self._scheduled.get(reminder_id) != fire_at:
+                    continue  # cancelled or rescheduled
+                del self._scheduled[reminder_id]
+                
+                task = asyncio.create_task(self._send_scheduled_notification(reminder_data))
+                self._sending.add(task)
+                task.add_done_callback(self._sending.discard)
+            
+            self._wake.clear()
+            timeout = self._heap[0][0] - now if self._heap else None
+            try:
+                await asyncio.wait_for(self._wake.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
     
     async def register_device(self, user_id: str, fcm_token: str, device_id: str, 
                              platform: str = "mobile", app_version: str = None) -> Dict[str, Any]:
@@ -91,29 +223,29 @@ class FirebaseRemindersService:
             if not fcm_token or len(fcm_token) < 10:
                 raise ValueError("Invalid FCM token provided")
             
-            # Store device info (in production, save to database)
+            now = datetime.now(timezone.utc)
+            now_iso = now.isoformat()
+            
+            # Store device info
             device_info = {
                 "user_id": user_id,
                 "fcm_token": fcm_token,
                 "device_id": device_id,
                 "platform": platform,
                 "app_version": app_version,
-                "registered_at": datetime.now().isoformat(),
-                "last_seen": datetime.now().isoformat(),
+                "registered_at": now_iso,
+                "last_seen": now_iso,
                 "active": True
             }
             
             # Store by user_id and device_id
-            if user_id not in self.devices:
-                self.devices[user_id] = {}
-            
-            self.devices[user_id][device_id] = device_info
+            await self.store.put_device(device_info)
             
             logger.info(f"✅ Device registered: {device_id} for user {user_id}")
             
             return {
                 "registration_id": f"{user_id}_{device_id}",
-                "expires_at": (datetime.now() + timedelta(days=30)).isoformat()
+                "expires_at": (now + timedelta(days=30)).isoformat()
             }
             
         except Exception as e:
@@ -128,49 +260,30 @@ class FirebaseRemindersService:
             if not self.firebase_app:
                 raise ValueError("Firebase not initialized")
             
-            # Generate reminder ID if not provided
-            if not reminder_id:
-                reminder_id = f"reminder_{user_id}_{int(datetime.now().timestamp())}"
-            
-            # Debug logging for incoming data
-            logger.info(f"📥 Received schedule_reminder request:")
-            logger.info(f"   user_id: {user_id}")
-            logger.info(f"   fcm_token: {fcm_token[:30]}...")
-            logger.info(f"   reminder_text: {reminder_text}")
-            logger.info(f"   scheduled_time: {scheduled_time} (type: {type(scheduled_time)})")
-            logger.info(f"   scheduled_time.tzinfo: {scheduled_time.tzinfo}")
-            logger.info(f"   reminder_id: {reminder_id}")
-            logger.info(f"   metadata: {metadata}")
-            
             # Normalize scheduled_time to timezone-aware UTC
             if scheduled_time.tzinfo is None:
-                logger.info(f"⚠️ Scheduled time is naive (no timezone), treating as UTC")
                 # treat naive times as UTC (server expects ISO with timezone ideally)
                 scheduled_time = scheduled_time.replace(tzinfo=timezone.utc)
-                logger.info(f"✅ Converted to timezone-aware: {scheduled_time}")
             else:
-                logger.info(f"✅ Scheduled time already has timezone: {scheduled_time.tzinfo}")
-                # convert to UTC
                 scheduled_time = scheduled_time.astimezone(timezone.utc)
-                logger.info(f"✅ Converted to UTC: {scheduled_time}")
-
-            # Use timezone-aware current time (UTC)
-            current_time = datetime.now(timezone.utc)
-            logger.info(f"🕐 Current server time (UTC): {current_time} (type: {type(current_time)}, tzinfo: {current_time.tzinfo})")
-            logger.info(f"🕐 Scheduled time (UTC): {scheduled_time} (type: {type(scheduled_time)}, tzinfo: {scheduled_time.tzinfo})")
             
-            try:
-                time_diff = (scheduled_time - current_time).total_seconds()
-                logger.info(f"🕐 Time difference (seconds): {time_diff}")
-            except Exception as e:
-                logger.error(f"❌ Error calculating time difference: {e}")
-                logger.error(f"   current_time: {current_time}, tzinfo: {current_time.tzinfo}")
-                logger.error(f"   scheduled_time: {scheduled_time}, tzinfo: {scheduled_time.tzinfo}")
-                raise
-
-            # Validate scheduled time
-            if scheduled_time <= current_time:
-                raise ValueError(f"Scheduled time {scheduled_time} must be in the future (current: {current_time})")
+            # Validate scheduled time before doing any other work
+            now = datetime.now(timezone.utc)
+            if scheduled_time <= now:
+                raise ValueError(f"Scheduled time {scheduled_time} must be in the future (current: {now})")
+            
+            # Generate reminder ID if not provided
+            if not reminder_id:
+                reminder_id = f"reminder_{user_id}_{int(now.timestamp())}"
+            
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug(
+                    f"📥 schedule_reminder: user_id={user_id}, fcm_token={fcm_token[:30]}..., "
+                    f"reminder_text={reminder_text!r}, scheduled_time={scheduled_time!r}, "
+                    f"reminder_id={reminder_id}, metadata={metadata}"
+                )
+            
+            scheduled_iso = scheduled_time.isoformat()
             
             # Create reminder data
             reminder_data = {
@@ -178,34 +291,26 @@ class FirebaseRemindersService:
                 "user_id": user_id,
                 "fcm_token": fcm_token,
                 "reminder_text": reminder_text,
-                "scheduled_time": scheduled_time.isoformat(),
+                "scheduled_time": scheduled_iso,
                 "metadata": metadata or {},
-                "created_at": datetime.now().isoformat(),
+                "created_at": now.isoformat(),
                 "status": "scheduled"
             }
             
-            # Store reminder (in production, save to database)
-            if user_id not in self.reminders:
-                self.reminders[user_id] = {}
+            # Store reminder
+            fire_at = scheduled_time.timestamp()
+            await self.store.put(reminder_data, score=fire_at)
             
-            self.reminders[user_id][reminder_id] = reminder_data
-            
-            # Schedule the notification job
+            # Queue the notification; replaces any earlier schedule for this ID
             job_id = f"firebase_reminder_{reminder_id}"
             
-            self.scheduler.add_job(
-                func=self._send_scheduled_notification,
-                trigger=DateTrigger(run_date=scheduled_time),
-                args=[reminder_data],
-                id=job_id,
-                replace_existing=True
-            )
+            self._enqueue(reminder_id, fire_at, reminder_data)
             
-            logger.info(f"✅ Firebase reminder scheduled: {reminder_id} for {scheduled_time}")
+            logger.info(f"✅ Firebase reminder scheduled: {reminder_id} for {scheduled_iso}")
             
             return {
                 "reminder_id": reminder_id,
-                "scheduled_for": scheduled_time.isoformat(),
+                "scheduled_for": scheduled_iso,
                 "notification_job_id": job_id
             }
             
@@ -216,43 +321,32 @@ class FirebaseRemindersService:
     async def _send_scheduled_notification(self, reminder_data: Dict[str, Any]):
         """Send the actual Firebase notification"""
         try:
-            logger.info(f"🔔 EXECUTING scheduled notification NOW!")
-            logger.info(f"🔔 Reminder ID: {reminder_data.get('reminder_id')}")
-            logger.info(f"🔔 User: {reminder_data.get('user_id')}")
-            logger.info(f"🔔 Message: {reminder_data.get('reminder_text')}")
-            logger.info(f"🕐 Current time: {datetime.now()}")
+            user_id = reminder_data["user_id"]
+            reminder_id = reminder_data["reminder_id"]
+            
+            # Another process may have cancelled or sent it since it was queued
+            stored = await self.store.get(user_id, reminder_id)
+            if not stored or stored.get("status") != "scheduled":
+                logger.info(f"⏭️ Skipping reminder {reminder_id}: no longer scheduled")
+                return
+            
+            logger.info(f"🔔 Sending reminder {reminder_id} to user {user_id}")
             
             if not self.firebase_app:
                 logger.error("❌ Firebase not initialized, cannot send notification")
                 return
             
-            # Create the Firebase message
-            message = messaging.Message(
-                notification=messaging.Notification(
-                    title="🔔 JARVIS Reminder",
-                    body=reminder_data["reminder_text"],
-                ),
-                data={
-                    "type": "reminder",
-                    "reminder_id": reminder_data["reminder_id"],
-                    "user_id": reminder_data["user_id"],
-                    "scheduled_time": reminder_data["scheduled_time"],
-                    "metadata": json.dumps(reminder_data.get("metadata", {}))
-                },
-                token=reminder_data["fcm_token"]
-            )
+            message = self._build_reminder_message(reminder_data)
             
-            # Send the message
-            response = await self._send_firebase_message(message)
+            # Send together with any other reminders firing now
+            response = await self.batcher.submit(message)
             
             # Update reminder status
-            user_id = reminder_data["user_id"]
-            reminder_id = reminder_data["reminder_id"]
-            
-            if user_id in self.reminders and reminder_id in self.reminders[user_id]:
-                self.reminders[user_id][reminder_id]["status"] = "sent"
-                self.reminders[user_id][reminder_id]["sent_at"] = datetime.now().isoformat()
-                self.reminders[user_id][reminder_id]["firebase_response"] = response
+            await self.store.update_status(
+                user_id, reminder_id, "sent",
+                sent_at=datetime.now(timezone.utc).isoformat(),
+                firebase_response=response
+            )
             
             logger.info(f"✅ Firebase notification sent: {reminder_id}, response: {response}")
             
@@ -263,17 +357,34 @@ class FirebaseRemindersService:
             user_id = reminder_data.get("user_id")
             reminder_id = reminder_data.get("reminder_id")
             
-            if user_id in self.reminders and reminder_id in self.reminders[user_id]:
-                self.reminders[user_id][reminder_id]["status"] = "failed"
-                self.reminders[user_id][reminder_id]["error"] = str(e)
+            try:
+                await self.store.update_status(user_id, reminder_id, "failed", error=str(e))
+            except Exception as store_error:
+                logger.error(f"❌ Failed to record reminder failure: {store_error}")
+    
+    @staticmethod
+    def _build_reminder_message(reminder_data: Dict[str, Any]) -> messaging.Message:
+        """Build the FCM message for a reminder; only the per-reminder fields vary"""
+        return messaging.Message(
+            notification=messaging.Notification(REMINDER_TITLE, reminder_data["reminder_text"]),
+            data={
+                "type": "reminder",
+                "reminder_id": reminder_data["reminder_id"],
+                "user_id": reminder_data["user_id"],
+                "scheduled_time": reminder_data["scheduled_time"],
+                "metadata": orjson.dumps(reminder_data.get("metadata") or {}).decode()
+            },
+            token=reminder_data["fcm_token"]
+        )
     
     async def _send_firebase_message(self, message: messaging.Message) -> str:
         """Send a Firebase message and return the response"""
         try:
-            # Firebase messaging.send is synchronous, wrap it for async
-            loop = asyncio.get_event_loop()
-            response = await loop.run_in_executor(None, messaging.send, message)
-            return response
+            batch = await _send_each([message])
+            response = batch.responses[0]
+            if not response.success:
+                raise response.exception
+            return response.message_id
         except Exception as e:
             logger.error(f"❌ Firebase messaging error: {e}")
             raise
@@ -281,24 +392,25 @@ class FirebaseRemindersService:
     async def cancel_reminder(self, user_id: str, reminder_id: str, fcm_token: str = None) -> Dict[str, Any]:
         """Cancel a scheduled Firebase reminder"""
         try:
-            # Find and cancel the scheduled job
+            # Drop the pending notification; its heap entry is skipped when popped
             job_id = f"firebase_reminder_{reminder_id}"
             
-            try:
-                self.scheduler.remove_job(job_id)
+            if self._scheduled.pop(reminder_id, None) is not None:
                 logger.info(f"✅ Cancelled scheduled job: {job_id}")
-            except Exception as e:
-                logger.warning(f"⚠️ Job {job_id} not found in scheduler: {e}")
+            else:
+                logger.warning(f"⚠️ Job {job_id} not found in scheduler")
             
             # Update reminder status
-            if user_id in self.reminders and reminder_id in self.reminders[user_id]:
-                self.reminders[user_id][reminder_id]["status"] = "cancelled"
-                self.reminders[user_id][reminder_id]["cancelled_at"] = datetime.now().isoformat()
+            cancelled_at = datetime.now(timezone.utc).isoformat()
+            await self.store.update_status(
+                user_id, reminder_id, "cancelled",
+                cancelled_at=cancelled_at
+            )
             
             logger.info(f"✅ Firebase reminder cancelled: {reminder_id}")
             
             return {
-                "cancelled_at": datetime.now().isoformat()
+                "cancelled_at": cancelled_at
             }
             
         except Exception as e:
@@ -320,7 +432,7 @@ class FirebaseRemindersService:
                 data={
                     "type": "test",
                     "user_id": user_id,
-                    "sent_at": datetime.now().isoformat()
+                    "sent_at": datetime.now(timezone.utc).isoformat()
                 },
                 token=fcm_token
             )
@@ -341,19 +453,32 @@ class FirebaseRemindersService:
     async def get_user_devices(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all registered devices for a user"""
         try:
-            if user_id in self.devices:
-                return list(self.devices[user_id].values())
-            return []
+            return await self.store.list_devices(user_id)
         except Exception as e:
             logger.error(f"❌ Failed to get user devices: {e}")
             return []
     
+    async def get_first_device(self, user_id: str) -> Optional[Dict[str, Any]]:
+        """Get the most recently registered device for a user"""
+        try:
+            devices = await self.store.list_devices(user_id)
+            if not devices:
+                return None
+            return max(devices, key=lambda d: d["registered_at"])
+        except Exception as e:
+            logger.error(f"❌ Failed to get user device: {e}")
+            return None
+    
     async def get_user_reminders(self, user_id: str) -> List[Dict[str, Any]]:
         """Get all reminders for a user"""
         try:
-            if user_id in self.reminders:
-                return list(self.reminders[user_id].values())
-            return []
+            return await self.store.list_by_user(user_id)
         except Exception as e:
             logger.error(f"❌ Failed to get user reminders: {e}")
-            return []
\ No newline at end of file
+            return []
+
+
+@lru_cache(maxsize=1)
+def get_firebase_service() -> FirebaseRemindersService:
+    """Get the shared FirebaseRemindersService instance"""
+    return FirebaseRemindersService()
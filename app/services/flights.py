@@ -1,15 +1,97 @@
 """
 Flights Service - Search and book flights using external APIs
 """
+import asyncio
+import heapq
 import logging
-from typing import Dict, Any, List, Optional
-from datetime import datetime
+import time
+from operator import attrgetter
+from typing import Dict, Any, Iterator, List, Optional
+from dataclasses import dataclass
+from datetime import date, datetime
+from functools import lru_cache
+from itertools import islice
 import httpx
+import orjson
+from dateutil import parser as date_parser
 
 from app.core.config import settings
 
 logger = logging.getLogger(__name__)
 
+# Simplified mapping - in production, use a proper API or database
+_CITY_TO_IATA = {
+    "delhi": "DEL",
+    "bangalore": "BLR",
+    "bengaluru": "BLR",
+    "mumbai": "BOM",
+    "chennai": "MAA",
+    "kolkata": "CCU",
+    "hyderabad": "HYD",
+    "pune": "PNQ",
+    "goa": "GOI",
+    "jaipur": "JAI",
+    "new york": "JFK",
+    "london": "LHR",
+    "dubai": "DXB",
+    "singapore": "SIN"
+}
+
+# Departure hours per time window as 24-bit masks (bit h set = hour h allowed)
+_WINDOW_MASK = {
+    "morning": sum(1 << h for h in range(6, 12)),
+    "afternoon": sum(1 << h for h in range(12, 16)),
+    "evening": sum(1 << h for h in range(16, 22)),
+    "night": sum(1 << h for h in (*range(22, 24), *range(0, 6)))
+}
+_ALL_HOURS = (1 << 24) - 1
+
+
+@dataclass(slots=True, frozen=True)
+class _MockFlight:
+    """Immutable mock flight row; dep_hour is pre-bound for filtering"""
+    airline: str
+    flight_number: str
+    departure_time: str
+    arrival_time: str
+    duration: str
+    price: int
+    dep_hour: int
+    currency: str = "INR"
+    direct: bool = True
+    stops: int = 0
+    
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "airline": self.airline,
+            "flight_number": self.flight_number,
+            "departure_time": self.departure_time,
+            "arrival_time": self.arrival_time,
+            "duration": self.duration,
+            "price": self.price,
+            "currency": self.currency,
+            "direct": self.direct,
+            "stops": self.stops
+        }
+
+
+_MOCK_FLIGHTS = (
+    _MockFlight("IndiGo", "6E-2045", "17:25", "19:55", "2h 30m", 7200, dep_hour=17),
+    _MockFlight("Air India", "AI-512", "18:15", "20:50", "2h 35m", 8500, dep_hour=18),
+    _MockFlight("SpiceJet", "SG-134", "19:00", "21:35", "2h 35m", 6800, dep_hour=19),
+)
+
+
+@lru_cache(maxsize=512)
+def _parse_relative_date(date_str: str, today: date) -> Optional[str]:
+    """Parse a date string, filling missing parts from `today` (YYYY-MM-DD or None)"""
+    try:
+        parsed = date_parser.parse(date_str, default=datetime(today.year, today.month, today.day))
+        return parsed.strftime("%Y-%m-%d")
+    except Exception as e:
+        logger.error(f"❌ Date parsing error: {e}")
+        return None
+
 
 class FlightsService:
     """
@@ -20,6 +102,26 @@ class FlightsService:
         self.skyscanner_api_key = settings.SKYSCANNER_API_KEY
         self.amadeus_api_key = settings.AMADEUS_API_KEY
         self.amadeus_api_secret = settings.AMADEUS_API_SECRET
+        self._amadeus_token: Optional[str] = None
+        self._amadeus_token_exp: float = 0  # monotonic deadline
+        self._amadeus_token_lock = asyncio.Lock()
+        self._http: Optional[httpx.AsyncClient] = None
+    
+    def _http_client(self) -> httpx.AsyncClient:
+        """Get the pooled HTTP client, creating it on first use"""
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                http2=True,
+                limits=httpx.Limits(max_keepalive_connections=20, max_connections=100),
+                timeout=10.0
+            )
+        return self._http
+    
+    async def aclose(self):
+        """Close the pooled HTTP client"""
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
     
     async def search_flights(
         self,
@@ -53,8 +155,8 @@ class FlightsService:
                 }
             
             # Get IATA codes for cities
-            source_code = await self._get_airport_code(source)
-            dest_code = await self._get_airport_code(destination)
+            source_code = self._get_airport_code(source)
+            dest_code = self._get_airport_code(destination)
             
             # Search flights
             flights = await self._search_flights_api(
@@ -81,7 +183,8 @@ class FlightsService:
                 "message": "Failed to search flights. Please try again."
             }
     
-    def _parse_date(self, date_str: str) -> Optional[str]:
+    @staticmethod
+    def _parse_date(date_str: str) -> Optional[str]:
         """
         Parse date string to YYYY-MM-DD format
         
@@ -91,15 +194,15 @@ class FlightsService:
         Returns:
             Date in YYYY-MM-DD format
         """
-        try:
-            from dateutil import parser
-            parsed = parser.parse(date_str)
-            return parsed.strftime("%Y-%m-%d")
-        except Exception as e:
-            logger.error(f"❌ Date parsing error: {e}")
-            return None
+        # Already ISO formatted (what mobile clients send)
+        if len(date_str) == 10 and date_str[4] == "-" and date_str[7] == "-" and date_str[:4].isdigit():
+            return date_str
+        
+        # Partial dates ("Friday", "25 Dec") resolve against today, so today is part of the cache key
+        return _parse_relative_date(date_str, date.today())
     
-    async def _get_airport_code(self, city: str) -> str:
+    @staticmethod
+    def _get_airport_code(city: str) -> str:
         """
         Get IATA airport code for city
         
@@ -109,25 +212,7 @@ class FlightsService:
         Returns:
             IATA code (e.g., DEL for Delhi)
         """
-        # Simplified mapping - in production, use a proper API or database
-        city_codes = {
-            "delhi": "DEL",
-            "bangalore": "BLR",
-            "bengaluru": "BLR",
-            "mumbai": "BOM",
-            "chennai": "MAA",
-            "kolkata": "CCU",
-            "hyderabad": "HYD",
-            "pune": "PNQ",
-            "goa": "GOI",
-            "jaipur": "JAI",
-            "new york": "JFK",
-            "london": "LHR",
-            "dubai": "DXB",
-            "singapore": "SIN"
-        }
-        
-        return city_codes.get(city.lower(), city[:3].upper())
+        return _CITY_TO_IATA.get(city.strip().lower()) or city[:3].upper()
     
     async def _search_flights_api(
         self,
@@ -168,83 +253,23 @@ class FlightsService:
     ) -> List[Dict[str, Any]]:
         """Generate mock flight data"""
         
-        flights = [
-            {
-                "airline": "IndiGo",
-                "flight_number": "6E-2045",
-                "departure_time": "17:25",
-                "arrival_time": "19:55",
-                "duration": "2h 30m",
-                "price": 7200,
-                "currency": "INR",
-                "direct": True,
-                "stops": 0
-            },
-            {
-                "airline": "Air India",
-                "flight_number": "AI-512",
-                "departure_time": "18:15",
-                "arrival_time": "20:50",
-                "duration": "2h 35m",
-                "price": 8500,
-                "currency": "INR",
-                "direct": True,
-                "stops": 0
-            },
-            {
-                "airline": "SpiceJet",
-                "flight_number": "SG-134",
-                "departure_time": "19:00",
-                "arrival_time": "21:35",
-                "duration": "2h 35m",
-                "price": 6800,
-                "currency": "INR",
-                "direct": True,
-                "stops": 0
-            }
-        ]
-        
-        # Filter by time window
-        if time_window:
-            flights = self._filter_by_time_window(flights, time_window)
-        
-        # Filter by preferences
-        if preferences.get("airline_pref"):
-            flights = [f for f in flights if f["airline"] == preferences["airline_pref"]]
-        
-        if preferences.get("max_price"):
-            flights = [f for f in flights if f["price"] <= preferences["max_price"]]
+        # Evaluate every active filter in one pass
+        hour_mask = _WINDOW_MASK.get(time_window.lower(), _ALL_HOURS) if time_window else _ALL_HOURS
+        airline = preferences.get("airline_pref")
+        max_price = preferences.get("max_price")
+        direct_only = preferences.get("flight_type") == "direct"
         
-        if preferences.get("flight_type") == "direct":
-            flights = [f for f in flights if f["direct"]]
-        
-        # Sort by price
-        flights.sort(key=lambda x: x["price"])
-        
-        return flights[:5]
-    
-    def _filter_by_time_window(
-        self,
-        flights: List[Dict[str, Any]],
-        time_window: str
-    ) -> List[Dict[str, Any]]:
-        """Filter flights by time of day"""
-        time_ranges = {
-            "morning": (6, 12),
-            "afternoon": (12, 16),
-            "evening": (16, 22),
-            "night": (22, 6)
-        }
-        
-        start_hour, end_hour = time_ranges.get(time_window.lower(), (0, 24))
-        
-        filtered = []
-        for flight in flights:
-            hour = int(flight["departure_time"].split(":")[0])
-            if start_hour <= hour < end_hour:
-                filtered.append(flight)
+        def matches(flight: _MockFlight) -> bool:
+            return (
+                (hour_mask >> flight.dep_hour) & 1
+                and (not airline or flight.airline == airline)
+                and (not max_price or flight.price <= max_price)
+                and (not direct_only or flight.direct)
+            )
         
-        return filtered
+        # Cheapest five, converted to dicts only for the response
+        cheapest = heapq.nsmallest(5, filter(matches, _MOCK_FLIGHTS), key=attrgetter("price"))
+        return [flight.to_dict() for flight in cheapest]
     
     async def _search_amadeus(
         self,
@@ -260,30 +285,44 @@ class FlightsService:
         # Get access token
         token = await self._get_amadeus_token()
         
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                "https://test.api.amadeus.com/v2/shopping/flight-offers",
-                headers={"Authorization": f"Bearer {token}"},
-                params={
-                    "originLocationCode": source,
-                    "destinationLocationCode": destination,
-                    "departureDate": date,
-                    "adults": 1,
-                    "max": 5
-                }
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                return self._parse_amadeus_response(data)
-            else:
-                logger.error(f"Amadeus API error: {response.status_code}")
-                return []
+        response = await self._http_client().get(
+            "https://test.api.amadeus.com/v2/shopping/flight-offers",
+            headers={"Authorization": f"Bearer {token}"},
+            params={
+                "originLocationCode": source,
+                "destinationLocationCode": destination,
+                "departureDate": date,
+                "adults": 1,
+                "max": 5
+            }
+        )
+        
+        if response.status_code == 200:
+            data = orjson.loads(response.content)
+            return list(islice(self._iter_amadeus_offers(data), 5))
+        else:
+            logger.error(f"Amadeus API error: {response.status_code}")
+            return []
+    
+    def _cached_amadeus_token(self) -> Optional[str]:
+        """Return the cached token if it is valid for at least another minute"""
+        if self._amadeus_token and time.monotonic() < self._amadeus_token_exp - 60:
+            return self._amadeus_token
+        return None
     
     async def _get_amadeus_token(self) -> str:
-        """Get Amadeus API access token"""
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
+        """Get Amadeus API access token, reusing it until shortly before expiry"""
+        token = self._cached_amadeus_token()
+        if token:
+            return token
+        
+        # Only one caller refreshes; the rest reuse its token
+        async with self._amadeus_token_lock:
+            token = self._cached_amadeus_token()
+            if token:
+                return token
+            
+            response = await self._http_client().post(
                 "https://test.api.amadeus.com/v1/security/oauth2/token",
                 data={
                     "grant_type": "client_credentials",
@@ -291,13 +330,32 @@ class FlightsService:
                     "client_secret": self.amadeus_api_secret
                 }
             )
-            return response.json()["access_token"]
+            data = response.json()
+            
+            self._amadeus_token = data["access_token"]
+            self._amadeus_token_exp = time.monotonic() + data.get("expires_in", 0)
+            return self._amadeus_token
     
-    def _parse_amadeus_response(self, data: Dict[str, Any]) -> List[Dict[str, Any]]:
-        """Parse Amadeus API response"""
-        flights = []
-        for offer in data.get("data", []):
-            # Parse flight details
-            # Implementation details...
-            pass
-        return flights
+    def _iter_amadeus_offers(self, data: Dict[str, Any]) -> Iterator[Dict[str, Any]]:
+        """Yield flights parsed from an Amadeus response, one offer at a time"""
+        for offer in data.get("data", ()):
+            itinerary = offer["itineraries"][0]
+            segments = itinerary["segments"]
+            first, last = segments[0], segments[-1]
+            yield {
+                "airline": first["carrierCode"],
+                "flight_number": f"{first['carrierCode']}-{first['number']}",
+                "departure_time": first["departure"]["at"][11:16],
+                "arrival_time": last["arrival"]["at"][11:16],
+                "duration": itinerary["duration"][2:].lower().replace("h", "h "),
+                "price": float(offer["price"]["total"]),
+                "currency": offer["price"]["currency"],
+                "direct": len(segments) == 1,
+                "stops": len(segments) - 1
+            }
+
+
+@lru_cache(maxsize=1)
+def get_flights_service() -> FlightsService:
+    """Get the shared FlightsService instance"""
+    return FlightsService()
@@ -2,16 +2,116 @@
 Intent Parser - Detects user intent and extracts entities
 Uses rule-based matching with LLM fallback
 """
+import asyncio
 import re
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Tuple
+import orjson
+from cachetools import TTLCache
 from openai import AsyncOpenAI
 
 from app.core.config import settings
+from app.core.openai_client import get_openai
 from app.models.schemas import Intent, IntentType
+from app.services.semantic_cache import SemanticCache
 
 logger = logging.getLogger(__name__)
 
+# Import sentence-transformers if a local intent model is configured
+if settings.LOCAL_INTENT_MODEL:
+    try:
+        import numpy as np
+        from sentence_transformers import SentenceTransformer
+        LOCAL_CLASSIFIER_AVAILABLE = True
+    except ImportError:
+        LOCAL_CLASSIFIER_AVAILABLE = False
+        logger.warning("⚠️ sentence-transformers not installed, local intent classifier disabled")
+else:
+    LOCAL_CLASSIFIER_AVAILABLE = False
+
+# Canonical phrases per intent for the local classifier. Intents whose slots
+# are free-form (alarm time, message body, booking details) have anchors too,
+# but a match on them defers to the LLM rather than answering locally.
+_INTENT_ANCHORS = {
+    IntentType.DELETE_ALARM: ["delete my alarm", "cancel the alarm", "turn off the alarm", "remove my alarm"],
+    IntentType.SEARCH_FLIGHTS: ["find flights", "search for a flight", "show me flights to", "any flights tomorrow"],
+    IntentType.GET_WEATHER: ["what's the weather", "is it going to rain", "how hot is it outside", "weather forecast"],
+    IntentType.SET_ALARM: ["set an alarm", "wake me up tomorrow morning", "set an alarm for tomorrow", "alarm for the morning"],
+    IntentType.BOOK_FLIGHT: ["book a flight", "book me a ticket", "reserve a seat on the flight"],
+    IntentType.SEND_MESSAGE: ["send a message", "text my friend", "tell mom I'm running late"],
+}
+_DEFER_TO_LLM = frozenset({IntentType.SET_ALARM, IntentType.BOOK_FLIGHT, IntentType.SEND_MESSAGE})
+LOCAL_INTENT_THRESHOLD = 0.55  # cosine similarity
+# Destructive intents need a closer match
+LOCAL_INTENT_THRESHOLDS = {IntentType.DELETE_ALARM: 0.7}
+LOCAL_INTENT_MARGIN = 0.08  # over the best anchor of any other intent
+LOCAL_INTENT_MAX_WORDS = 12  # longer requests go to the LLM
+
+# LLM parses are reused for identical text, and for paraphrases of requests
+# whose intent never takes slots (a paraphrase can differ in time, city, etc.)
+_SEMANTIC_CACHE_INTENTS = frozenset({IntentType.DELETE_ALARM, IntentType.GET_WEATHER})
+LLM_CACHE_SIZE = 10_000
+LLM_CACHE_TTL = 24 * 3600  # seconds
+LLM_CACHE_EMBEDDING_MODEL = "text-embedding-3-small"
+LLM_CACHE_THRESHOLD = 0.93  # cosine similarity
+
+INTENT_SYSTEM_PROMPT = (
+    "You are an intent parser for a voice assistant. Classify the user's request as one of: "
+    + ", ".join(intent.value for intent in IntentType)
+    + '. Reply with JSON: {"intent": "...", "slots": {"key": "value"}, "confidence": 0.0-1.0}'
+)
+
+# Flight slot patterns, compiled once at import
+_FROM_RE = re.compile(r"from\s+([a-z\s]+?)(?:\s+to|\s+for|\s+on|$)", re.IGNORECASE)
+_TO_RE = re.compile(r"to\s+([a-z\s]+?)(?:\s+on|\s+for|$)", re.IGNORECASE)
+_DATE_RE = re.compile(
+    r"(?:on\s+)?(\d{1,2}(?:st|nd|rd|th)?\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\s+\d{4})",
+    re.IGNORECASE
+)
+# No word boundaries, so "tonight" and "nights" still count as night
+_TIME_WINDOW_RE = re.compile(r"morning|afternoon|evening|night", re.IGNORECASE)
+
+
+class LocalIntentClassifier:
+    """
+    Nearest-anchor intent classifier on a small sentence-embedding model
+    
+    The model loads on first use; calls are CPU-bound, so run them off the
+    event loop.
+    """
+    
+    def __init__(self, model_name: str):
+        self.model_name = model_name
+        self._model = None
+        self._anchors = None
+        self._labels: List[IntentType] = []
+    
+    def _load(self):
+        logger.info(f"🔄 Loading local intent model {self.model_name}")
+        self._model = SentenceTransformer(self.model_name)
+        phrases = []
+        for intent, examples in _INTENT_ANCHORS.items():
+            phrases.extend(examples)
+            self._labels.extend([intent] * len(examples))
+        self._anchors = self._model.encode(phrases, normalize_embeddings=True)
+    
+    def classify(self, text: str) -> Tuple[IntentType, float, float]:
+        """
+        Return the closest intent, its cosine similarity, and its margin
+        over the closest anchor of any other intent
+        """
+        if self._model is None:
+            self._load()
+        vector = self._model.encode(text, normalize_embeddings=True)
+        scores = self._anchors @ vector
+        best = int(np.argmax(scores))
+        intent = self._labels[best]
+        runner_up = max(
+            (float(score) for label, score in zip(self._labels, scores) if label != intent),
+            default=-1.0
+        )
+        return intent, float(scores[best]), float(scores[best]) - runner_up
+
 
 class IntentParser:
     """
@@ -19,20 +119,40 @@ class IntentParser:
     
     Strategy:
     1. Rule-based pattern matching (fast, cheap)
-    2. LLM fallback for complex queries (accurate)
+    2. Local embedding classifier for short utterances (no network)
+    3. LLM fallback for complex queries (accurate)
     """
     
-    def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+    # Every rule-based pattern contains at least one of these words
+    _TRIGGERS = frozenset({
+        "alarm", "wake", "remind", "flight", "ticket", "book",
+        "weather", "temperature", "cancel", "delete", "remove",
+    })
+    
+    def __init__(self, client: Optional[AsyncOpenAI] = None):
+        self.client = client or get_openai()
+        self.local_classifier = (
+            LocalIntentClassifier(settings.LOCAL_INTENT_MODEL) if LOCAL_CLASSIFIER_AVAILABLE else None
+        )
         self.intent_patterns = self._load_intent_patterns()
+        self._combined = self._combine_patterns(self.intent_patterns)
+        self._trigger_re = re.compile("|".join(sorted(self._TRIGGERS)), re.IGNORECASE)
+        self._exact_cache: TTLCache = TTLCache(maxsize=LLM_CACHE_SIZE, ttl=LLM_CACHE_TTL)
+        self._semantic_cache = SemanticCache(
+            threshold=LLM_CACHE_THRESHOLD, ttl=LLM_CACHE_TTL, maxsize=LLM_CACHE_SIZE
+        )
     
-    def _load_intent_patterns(self) -> Dict[IntentType, list]:
-        """Load rule-based patterns for each intent"""
+    def _load_intent_patterns(self) -> Dict[IntentType, List[str]]:
+        """
+        Load rule-based patterns for each intent
+        
+        Slots are named groups (e.g. (?P<time>...)). Group names must be
+        unique across all patterns since they share one compiled regex.
+        """
         return {
             IntentType.SET_ALARM: [
-                r"set (?:an? )?alarm (?:for|at) (\d{1,2}(?::\d{2})?\s*(?:am|pm)?)",
-                r"wake me (?:up )?(?:at|by) (\d{1,2}(?::\d{2})?\s*(?:am|pm)?)",
-                r"remind me (?:at|by) (\d{1,2}(?::\d{2})?\s*(?:am|pm)?)",
+                r"(?:set (?:an? )?alarm (?:for|at)|wake me (?:up )?(?:at|by)|remind me (?:at|by)) "
+                r"(?P<time>\d{1,2}(?::\d{2})?\s*(?:am|pm)?)",
             ],
             IntentType.DELETE_ALARM: [
                 r"delete (?:the )?alarm",
@@ -51,6 +171,23 @@ class IntentParser:
             ],
         }
     
+    @staticmethod
+    def _combine_patterns(table: Dict[IntentType, List[str]]) -> re.Pattern:
+        """
+        Fuse every intent pattern into one alternation
+        
+        Each branch is a named group "<INTENT>__<n>", so the intent is
+        recovered from match.lastgroup after a single search.
+        """
+        return re.compile(
+            "|".join(
+                f"(?P<{intent.name}__{i}>{pattern})"
+                for intent, patterns in table.items()
+                for i, pattern in enumerate(patterns)
+            ),
+            re.IGNORECASE
+        )
+    
     async def parse(self, text: str) -> Intent:
         """
         Parse user input to extract intent and slots
@@ -61,98 +198,158 @@ class IntentParser:
         Returns:
             Intent object with detected intent, slots, and confidence
         """
-        text_lower = text.lower().strip()
+        text = text.strip()
         
-        # Try rule-based matching first
-        rule_based_intent = self._rule_based_parse(text_lower)
+        # Try rule-based matching first (patterns are case-insensitive)
+        rule_based_intent = self._rule_based_parse(text)
         if rule_based_intent and rule_based_intent.confidence > 0.8:
             logger.info(f"✅ Rule-based match: {rule_based_intent.intent}")
             return rule_based_intent
         
-        # Fallback to LLM for complex queries
-        logger.info("🤖 Using LLM for intent parsing")
-        llm_intent = await self._llm_parse(text)
+        # Try the local classifier for short utterances
+        local_intent = await self._local_parse(text)
+        if local_intent:
+            logger.info(f"✅ Local classifier match: {local_intent.intent} ({local_intent.confidence:.2f})")
+            return local_intent
         
-        return llm_intent
+        # Fallback to LLM for complex queries
+        return await self._cached_llm_parse(text)
     
     def _rule_based_parse(self, text: str) -> Optional[Intent]:
         """
         Rule-based intent detection using regex patterns
         
         Args:
-            text: User input (lowercase)
+            text: User input (any case)
             
         Returns:
             Intent or None if no match
         """
-        for intent_type, patterns in self.intent_patterns.items():
-            for pattern in patterns:
-                match = re.search(pattern, text, re.IGNORECASE)
-                if match:
-                    slots = self._extract_slots_from_pattern(text, intent_type, match)
-                    return Intent(
-                        intent=intent_type,
-                        slots=slots,
-                        confidence=0.9,
-                        original_text=text
-                    )
-        
-        return None
-    
-    def _extract_slots_from_pattern(
-        self,
-        text: str,
-        intent: IntentType,
-        match: re.Match
-    ) -> Dict[str, Any]:
-        """Extract slot values based on intent type"""
-        slots = {}
+        # Literal keyword scan first; most inputs without one skip the patterns
+        if not self._trigger_re.search(text):
+            return None
         
-        if intent == IntentType.SET_ALARM:
-            # Extract time
-            if match.groups():
-                slots["time"] = match.group(1)
+        match = self._combined.search(text)
+        if not match:
+            return None
         
-        elif intent == IntentType.SEARCH_FLIGHTS:
-            # Extract locations and dates
+        intent_type = IntentType[match.lastgroup.split("__")[0]]
+        # Branch markers contain "__", everything else is a slot
+        slots = {k: v.lower() for k, v in match.groupdict().items() if v and "__" not in k}
+        if intent_type == IntentType.SEARCH_FLIGHTS:
             slots.update(self._extract_flight_slots(text))
+        return Intent(
+            intent=intent_type,
+            slots=slots,
+            confidence=0.9,
+            original_text=text
+        )
+    
+    async def _local_parse(self, text: str) -> Optional[Intent]:
+        """
+        Classify with the local embedding model
         
-        return slots
+        Args:
+            text: User input
+            
+        Returns:
+            Intent, or None if unavailable, too long, ambiguous, not
+            confident, or an intent whose slots need the LLM
+        """
+        if self.local_classifier is None or len(text.split()) > LOCAL_INTENT_MAX_WORDS:
+            return None
+        
+        try:
+            intent_type, score, margin = await asyncio.to_thread(self.local_classifier.classify, text)
+        except Exception as e:
+            logger.error(f"❌ Local intent classifier error: {e}")
+            return None
+        
+        if intent_type in _DEFER_TO_LLM:
+            return None
+        if score <= LOCAL_INTENT_THRESHOLDS.get(intent_type, LOCAL_INTENT_THRESHOLD):
+            return None
+        if margin < LOCAL_INTENT_MARGIN:
+            return None
+        
+        slots = self._extract_flight_slots(text) if intent_type == IntentType.SEARCH_FLIGHTS else {}
+        return Intent(
+            intent=intent_type,
+            slots=slots,
+            confidence=score,
+            original_text=text
+        )
     
     def _extract_flight_slots(self, text: str) -> Dict[str, Any]:
         """Extract flight-specific slots"""
         slots = {}
         
         # Extract source and destination
-        from_match = re.search(r"from\s+([a-z\s]+?)(?:\s+to|\s+for|\s+on|$)", text, re.IGNORECASE)
-        to_match = re.search(r"to\s+([a-z\s]+?)(?:\s+on|\s+for|$)", text, re.IGNORECASE)
+        from_match = _FROM_RE.search(text)
+        to_match = _TO_RE.search(text)
         
         if from_match:
-            slots["source"] = from_match.group(1).strip()
+            slots["source"] = from_match.group(1).strip().lower()
         if to_match:
-            slots["destination"] = to_match.group(1).strip()
+            slots["destination"] = to_match.group(1).strip().lower()
         
         # Extract date
-        date_match = re.search(
-            r"(?:on\s+)?(\d{1,2}(?:st|nd|rd|th)?\s+(?:jan|feb|mar|apr|may|jun|jul|aug|sep|oct|nov|dec)[a-z]*\s+\d{4})",
-            text,
-            re.IGNORECASE
-        )
+        date_match = _DATE_RE.search(text)
         if date_match:
-            slots["date"] = date_match.group(1)
+            slots["date"] = date_match.group(1).lower()
         
         # Extract time window
-        if "morning" in text:
-            slots["time_window"] = "morning"
-        elif "afternoon" in text:
-            slots["time_window"] = "afternoon"
-        elif "evening" in text:
-            slots["time_window"] = "evening"
-        elif "night" in text:
-            slots["time_window"] = "night"
+        window_match = _TIME_WINDOW_RE.search(text)
+        if window_match:
+            slots["time_window"] = window_match.group(0).lower()
         
         return slots
     
+    async def _cached_llm_parse(self, text: str) -> Intent:
+        """
+        LLM parse behind an exact cache and a semantic cache
+        
+        Args:
+            text: User input
+            
+        Returns:
+            Intent, with original_text set to this input
+        """
+        text_lower = text.lower()
+        cached = self._exact_cache.get(text_lower)
+        if cached is not None:
+            logger.info(f"⚡ Intent cache hit: {cached.intent}")
+            return cached.model_copy(update={"original_text": text})
+        
+        embedding = await self._embed(text_lower)
+        if embedding is not None:
+            cached = self._semantic_cache.get(embedding)
+            if cached is not None and cached.intent in _SEMANTIC_CACHE_INTENTS:
+                logger.info(f"⚡ Semantic intent cache hit: {cached.intent}")
+                return cached.model_copy(update={"original_text": text})
+        
+        logger.info("🤖 Using LLM for intent parsing")
+        intent = await self._llm_parse(text)
+        
+        # Failed parses come back as UNKNOWN with zero confidence; don't pin them
+        if intent.confidence > 0:
+            self._exact_cache[text_lower] = intent
+            if embedding is not None and intent.intent in _SEMANTIC_CACHE_INTENTS:
+                self._semantic_cache.put(embedding, intent)
+        return intent
+    
+    async def _embed(self, text: str) -> Optional[List[float]]:
+        """Embed text for the semantic cache (None on failure, so the lookup is skipped)"""
+        try:
+            response = await self.client.embeddings.create(
+                model=LLM_CACHE_EMBEDDING_MODEL,
+                input=text
+            )
+            return response.data[0].embedding
+        except Exception as e:
+            logger.warning(f"⚠️ Intent embedding failed, skipping semantic cache: {e}")
+            return None
+    
     async def _llm_parse(self, text: str) -> Intent:
         """
         Use LLM to parse complex queries
@@ -163,32 +360,19 @@ class IntentParser:
         Returns:
             Intent parsed by LLM
         """
-        prompt = f"""You are an intent parser for a voice assistant. Analyze the user's request and extract:
-1. Intent (one of: set_alarm, delete_alarm, search_flights, book_flight, get_weather, send_message, unknown)
-2. Slots (key-value pairs of entities)
-
-User request: "{text}"
-
-Respond in JSON format:
-{{
-    "intent": "intent_name",
-    "slots": {{"key": "value"}},
-    "confidence": 0.95
-}}"""
-
         try:
             response = await self.client.chat.completions.create(
-                model=settings.DEFAULT_LLM_MODEL,
+                model=settings.INTENT_LLM_MODEL,
                 messages=[
-                    {"role": "system", "content": "You are an expert intent parser. Always respond with valid JSON."},
-                    {"role": "user", "content": prompt}
+                    {"role": "system", "content": INTENT_SYSTEM_PROMPT},
+                    {"role": "user", "content": text}
                 ],
-                temperature=0.3,
-                max_tokens=200
+                response_format={"type": "json_object"},
+                temperature=0,
+                max_tokens=80
             )
             
-            import json
-            result = json.loads(response.choices[0].message.content)
+            result = orjson.loads(response.choices[0].message.content)
             
             # Map string to IntentType
             intent_str = result.get("intent", "unknown")
@@ -5,14 +5,34 @@ Uses MongoDB for metadata and Vector DB for embeddings
 import logging
 from typing import Dict, Any, Optional, List
 from datetime import datetime
+from cachetools import TTLCache
 from openai import AsyncOpenAI
 
+from app.core.batching import MicroBatcher
 from app.core.config import settings
 from app.core.database import get_database
+from app.core.openai_client import get_openai
 from app.models.schemas import UserPreferences, IntentType
 
 logger = logging.getLogger(__name__)
 
+# Conversation writes are buffered and flushed with insert_many
+CONVERSATION_BATCH_SIZE = 50
+CONVERSATION_FLUSH_INTERVAL = 0.1  # seconds
+
+# Fields returned for conversation history (skips _id and user_id)
+CONVERSATION_PROJECTION = {"text": 1, "intent": 1, "response": 1, "timestamp": 1, "_id": 0}
+
+# Largest input list the embeddings endpoint accepts per request
+EMBEDDING_BATCH_SIZE = 2048
+
+# Only these intents read user context; everything else skips Mongo
+CONTEXT_INTENTS = frozenset({IntentType.SET_ALARM, IntentType.SEARCH_FLIGHTS})
+
+# Preferences change rarely, so they are served from memory between edits
+PREFERENCES_CACHE_SIZE = 10_000
+PREFERENCES_CACHE_TTL = 300  # seconds
+
 
 class MemoryService:
     """
@@ -23,9 +43,13 @@ class MemoryService:
     - Vector DB: Semantic memory for contextual retrieval
     """
     
-    def __init__(self):
+    def __init__(self, client: Optional[AsyncOpenAI] = None):
         self.db = None
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = client or get_openai()
+        self._writer = MicroBatcher(
+            self._write_batch, CONVERSATION_BATCH_SIZE, CONVERSATION_FLUSH_INTERVAL
+        )
+        self._pref_cache: TTLCache = TTLCache(maxsize=PREFERENCES_CACHE_SIZE, ttl=PREFERENCES_CACHE_TTL)
         # Vector DB would be initialized here (Pinecone/Supabase)
     
     def _get_db(self):
@@ -49,18 +73,16 @@ class MemoryService:
         Returns:
             Dictionary with user preferences and context
         """
+        if intent not in CONTEXT_INTENTS:
+            return {"preferences": {}, "recent_conversations": [], "intent_specific": {}}
+        
         try:
-            db = self._get_db()
-            
-            # Get user preferences
-            preferences = await db.user_preferences.find_one({"user_id": user_id})
-            
-            if not preferences:
-                # Create default preferences
-                preferences = await self._create_default_preferences(user_id)
+            preferences = await self._get_preferences(user_id)
             
-            # Get recent conversation history
-            recent_conversations = await self._get_recent_conversations(user_id, limit=5)
+            # Get recent conversation history (alarms never use it)
+            recent_conversations = []
+            if settings.ENABLE_HISTORY_CONTEXT and intent != IntentType.SET_ALARM:
+                recent_conversations = await self._get_recent_conversations(user_id, limit=5)
             
             context = {
                 "preferences": preferences,
@@ -76,6 +98,20 @@ class MemoryService:
             logger.error(f"❌ Memory retrieval error: {e}")
             return {"preferences": {}, "recent_conversations": []}
     
+    async def _get_preferences(self, user_id: str) -> Dict[str, Any]:
+        """Get user preferences, from cache when possible"""
+        preferences = self._pref_cache.get(user_id)
+        if preferences is not None:
+            return preferences
+        
+        preferences = await self._get_db().user_preferences.find_one({"user_id": user_id})
+        if not preferences:
+            # Create default preferences
+            preferences = await self._create_default_preferences(user_id)
+        
+        self._pref_cache[user_id] = preferences
+        return preferences
+    
     async def _create_default_preferences(self, user_id: str) -> Dict[str, Any]:
         """Create default user preferences"""
         db = self._get_db()
@@ -103,8 +139,10 @@ class MemoryService:
         """Get recent conversation history"""
         db = self._get_db()
         
+        # Served by the (user_id, timestamp desc) index from create_indexes
         conversations = await db.conversations.find(
-            {"user_id": user_id}
+            {"user_id": user_id},
+            CONVERSATION_PROJECTION
         ).sort("timestamp", -1).limit(limit).to_list(length=limit)
         
         return conversations
@@ -144,7 +182,7 @@ class MemoryService:
         response: Optional[str] = None
     ):
         """
-        Store conversation in memory
+        Queue a conversation for the next batched write
         
         Args:
             user_id: User identifier
@@ -153,25 +191,48 @@ class MemoryService:
             timestamp: Conversation timestamp
             response: Bot response
         """
+        self._writer.submit_nowait({
+            "user_id": user_id,
+            "text": text,
+            "intent": intent,
+            "response": response,
+            "timestamp": timestamp
+        })
+    
+    async def _write_batch(self, batch: List[Dict[str, Any]]):
+        """Insert a batch of conversations"""
         try:
-            db = self._get_db()
-            
-            conversation = {
-                "user_id": user_id,
-                "text": text,
-                "intent": intent,
-                "response": response,
-                "timestamp": timestamp
-            }
-            
-            await db.conversations.insert_one(conversation)
-            
-            # TODO: Store embedding in vector DB for semantic search
-            # embedding = await self._create_embedding(text)
-            # await self._store_in_vector_db(user_id, text, embedding)
-            
+            await self._get_db().conversations.insert_many(batch, ordered=False)
         except Exception as e:
-            logger.error(f"❌ Conversation storage error: {e}")
+            logger.error(f"❌ Conversation storage error ({len(batch)} docs): {e}")
+        
+        # TODO: Store embeddings in vector DB for semantic search
+        # texts = [doc["text"] for doc in batch]
+        # embeddings = await self._create_embeddings(texts)
+        # await self._store_in_vector_db(batch, embeddings)
+    
+    async def aclose(self):
+        """Write queued conversations and stop the writer"""
+        await self._writer.aclose()
+    
+    async def update_user_preferences(self, user_id: str, preferences: Dict[str, Any]):
+        """
+        Update several user preferences and drop the cached copy
+        
+        Every preferences write goes through here so the cache stays fresh.
+        
+        Args:
+            user_id: User identifier
+            preferences: Fields to set
+        """
+        db = self._get_db()
+        
+        await db.user_preferences.update_one(
+            {"user_id": user_id},
+            {"$set": preferences},
+            upsert=True
+        )
+        self._pref_cache.pop(user_id, None)
     
     async def update_user_preference(
         self,
@@ -181,27 +242,34 @@ class MemoryService:
     ):
         """Update a specific user preference"""
         try:
-            db = self._get_db()
-            
-            await db.user_preferences.update_one(
-                {"user_id": user_id},
-                {"$set": {key: value}},
-                upsert=True
-            )
+            await self.update_user_preferences(user_id, {key: value})
             
             logger.info(f"✅ Updated preference {key} for user {user_id}")
             
         except Exception as e:
             logger.error(f"❌ Preference update error: {e}")
     
-    async def _create_embedding(self, text: str) -> List[float]:
-        """Create embedding for semantic search"""
+    async def _create_embeddings(self, texts: List[str]) -> List[List[float]]:
+        """
+        Create embeddings for semantic search in as few API calls as possible
+        
+        Args:
+            texts: Texts to embed (duplicates are embedded once)
+            
+        Returns:
+            One embedding per input text, empty lists on error
+        """
+        unique = list(dict.fromkeys(texts))
+        vectors: Dict[str, List[float]] = {}
         try:
-            response = await self.client.embeddings.create(
-                model="text-embedding-3-small",
-                input=text
-            )
-            return response.data[0].embedding
+            for start in range(0, len(unique), EMBEDDING_BATCH_SIZE):
+                chunk = unique[start:start + EMBEDDING_BATCH_SIZE]
+                response = await self.client.embeddings.create(
+                    model="text-embedding-3-small",
+                    input=chunk
+                )
+                for item in response.data:
+                    vectors[chunk[item.index]] = item.embedding
         except Exception as e:
             logger.error(f"❌ Embedding creation error: {e}")
-            return []
+        return [vectors.get(text, []) for text in texts]
@@ -2,22 +2,86 @@
 News Service - Fetches and summarizes news using ChatGPT
 """
 import logging
-from typing import Dict, Any, List
+import time
+from typing import Dict, Any, List, Optional, Tuple
 from datetime import datetime
+from cachetools import TTLCache
 from openai import AsyncOpenAI
 
 from app.core.config import settings
+from app.core.openai_client import get_openai
+from app.services.semantic_cache import SemanticCache
 
 logger = logging.getLogger(__name__)
 
+# Headlines per (category, count, date) are shared by every user
+NEWS_CACHE_TTL = 6 * 3600  # seconds
+
+# Topic summaries are reused for paraphrased topics
+TOPIC_EMBEDDING_MODEL = "text-embedding-3-small"
+TOPIC_CACHE_THRESHOLD = 0.92  # cosine similarity
+TOPIC_CACHE_TTL = 12 * 3600  # seconds
+
+# Formatted date, refreshed at most once a minute
+_TODAY_CACHE: Tuple[float, str] = (0.0, "")
+
+
+def _today_str() -> str:
+    """Get today's date formatted for prompts (e.g. January 05, 2025)"""
+    global _TODAY_CACHE
+    now = time.time()
+    stamped_at, today = _TODAY_CACHE
+    if now - stamped_at < 60:
+        return today
+    today = datetime.now().strftime("%B %d, %Y")
+    _TODAY_CACHE = (now, today)
+    return today
+
+
+# News prompts per category; unknown categories use the generic template
+_GENERAL_PROMPT_TEMPLATE = """Today is {today}. Please provide a brief summary of the top {count} news headlines for today. 
+Include a mix of important global news, technology, and interesting stories. 
+Format: Start with a brief overview, then list key headlines.
+Keep it conversational and concise (under 300 words)."""
+
+_TECH_PROMPT_TEMPLATE = """Today is {today}. Please provide a brief summary of the top {count} technology news stories for today.
+Focus on: AI developments, tech company news, new products, cybersecurity, and innovation.
+Format: Brief overview followed by key headlines.
+Keep it conversational and concise (under 300 words)."""
+
+_SPORTS_PROMPT_TEMPLATE = """Today is {today}. Please provide a brief summary of the top {count} sports news stories for today.
+Include: major game results, player news, upcoming matches, and significant sports events.
+Format: Brief overview followed by key headlines.
+Keep it conversational and concise (under 300 words)."""
+
+_BUSINESS_PROMPT_TEMPLATE = """Today is {today}. Please provide a brief summary of the top {count} business and finance news stories for today.
+Include: market updates, company news, economic indicators, and major business developments.
+Format: Brief overview followed by key headlines.
+Keep it conversational and concise (under 300 words)."""
+
+_DEFAULT_PROMPT_TEMPLATE = """Today is {today}. Please provide a brief summary of the top {count} {category} news headlines for today.
+Keep it conversational and concise (under 300 words)."""
+
+_PROMPT_TEMPLATES: Dict[str, str] = {
+    "general": _GENERAL_PROMPT_TEMPLATE,
+    "today": _GENERAL_PROMPT_TEMPLATE,
+    "tech": _TECH_PROMPT_TEMPLATE,
+    "technology": _TECH_PROMPT_TEMPLATE,
+    "sports": _SPORTS_PROMPT_TEMPLATE,
+    "business": _BUSINESS_PROMPT_TEMPLATE,
+    "finance": _BUSINESS_PROMPT_TEMPLATE,
+}
+
 
 class NewsService:
     """
     Handles news queries using ChatGPT
     """
     
-    def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+    def __init__(self, client: Optional[AsyncOpenAI] = None):
+        self.client = client or get_openai()
+        self._news_cache: TTLCache = TTLCache(maxsize=256, ttl=NEWS_CACHE_TTL)
+        self._topic_cache = SemanticCache(threshold=TOPIC_CACHE_THRESHOLD, ttl=TOPIC_CACHE_TTL)
     
     async def get_news(
         self,
@@ -40,7 +104,13 @@ class NewsService:
             logger.info(f"📰 Fetching {category} news for user {user_id}")
             
             # Get current date for context
-            today = datetime.now().strftime("%B %d, %Y")
+            today = _today_str()
+            
+            cache_key = (category, count, today)
+            cached = self._news_cache.get(cache_key)
+            if cached is not None:
+                logger.info(f"⚡ News cache hit: {category}")
+                return cached
             
             # Create prompt for ChatGPT
             prompt = self._create_news_prompt(category, count, today)
@@ -64,13 +134,15 @@ class NewsService:
             
             news_summary = response.choices[0].message.content
             
-            return {
+            result = {
                 "status": "success",
                 "category": category,
                 "date": today,
                 "summary": news_summary,
                 "message": news_summary
             }
+            self._news_cache[cache_key] = result
+            return result
             
         except Exception as e:
             logger.error(f"❌ News fetch error: {e}", exc_info=True)
@@ -81,36 +153,8 @@ class NewsService:
     
     def _create_news_prompt(self, category: str, count: int, today: str) -> str:
         """Create prompt for ChatGPT to generate news"""
-        
-        if category == "general" or category == "today":
-            prompt = f"""Today is {today}. Please provide a brief summary of the top {count} news headlines for today. 
-Include a mix of important global news, technology, and interesting stories. 
-Format: Start with a brief overview, then list key headlines.
-Keep it conversational and concise (under 300 words)."""
-        
-        elif category == "tech" or category == "technology":
-            prompt = f"""Today is {today}. Please provide a brief summary of the top {count} technology news stories for today.
-Focus on: AI developments, tech company news, new products, cybersecurity, and innovation.
-Format: Brief overview followed by key headlines.
-Keep it conversational and concise (under 300 words)."""
-        
-        elif category == "sports":
-            prompt = f"""Today is {today}. Please provide a brief summary of the top {count} sports news stories for today.
-Include: major game results, player news, upcoming matches, and significant sports events.
-Format: Brief overview followed by key headlines.
-Keep it conversational and concise (under 300 words)."""
-        
-        elif category == "business" or category == "finance":
-            prompt = f"""Today is {today}. Please provide a brief summary of the top {count} business and finance news stories for today.
-Include: market updates, company news, economic indicators, and major business developments.
-Format: Brief overview followed by key headlines.
-Keep it conversational and concise (under 300 words)."""
-        
-        else:
-            prompt = f"""Today is {today}. Please provide a brief summary of the top {count} {category} news headlines for today.
-Keep it conversational and concise (under 300 words)."""
-        
-        return prompt
+        template = _PROMPT_TEMPLATES.get(category, _DEFAULT_PROMPT_TEMPLATE)
+        return template.format(count=count, today=today, category=category)
     
     async def get_news_about_topic(
         self,
@@ -128,7 +172,14 @@ Keep it conversational and concise (under 300 words)."""
             Dict with status and news data
         """
         try:
-            today = datetime.now().strftime("%B %d, %Y")
+            today = _today_str()
+            
+            embedding = await self._embed_topic(topic)
+            if embedding is not None:
+                cached = self._topic_cache.get(embedding)
+                if cached is not None:
+                    logger.info(f"⚡ Topic news cache hit: {topic}")
+                    return cached
             
             prompt = f"""Today is {today}. Please provide a brief summary of recent news about: {topic}
 Include the most relevant and recent information.
@@ -153,13 +204,16 @@ Keep it conversational and concise (under 300 words)."""
             
             news_summary = response.choices[0].message.content
             
-            return {
+            result = {
                 "status": "success",
                 "topic": topic,
                 "date": today,
                 "summary": news_summary,
                 "message": news_summary
             }
+            if embedding is not None:
+                self._topic_cache.put(embedding, result)
+            return result
             
         except Exception as e:
             logger.error(f"❌ Topic news fetch error: {e}", exc_info=True)
@@ -167,3 +221,15 @@ Keep it conversational and concise (under 300 words)."""
                 "status": "error",
                 "message": f"I'm having trouble finding news about {topic} right now."
             }
+    
+    async def _embed_topic(self, topic: str) -> Optional[List[float]]:
+        """Embed a topic for the semantic cache (None on failure, so the lookup is skipped)"""
+        try:
+            response = await self.client.embeddings.create(
+                model=TOPIC_EMBEDDING_MODEL,
+                input=topic.strip().lower()
+            )
+            return response.data[0].embedding
+        except Exception as e:
+            logger.warning(f"⚠️ Topic embedding failed: {e}")
+            return None
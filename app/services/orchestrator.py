@@ -2,20 +2,38 @@
 Main Orchestrator - The Brain of Jarvis
 Coordinates all services and manages conversation flow
 """
-from typing import Dict, Any, Optional
+from typing import AsyncIterator, Dict, Any, Optional, Tuple
+import asyncio
+import base64
 import logging
+import orjson
 from datetime import datetime
+from functools import lru_cache
 
+from app.core.openai_client import get_openai
 from app.services.stt import STTService
 from app.services.tts import TTSService
 from app.services.intent_parser import IntentParser
 from app.services.memory import MemoryService
 from app.services.command_router import CommandRouter
 from app.services.response_builder import ResponseBuilder
-from app.models.schemas import ConversationRequest, ConversationResponse
+from app.models.schemas import ConversationRequest, ConversationResponse, IntentType
 
 logger = logging.getLogger(__name__)
 
+def _b64(audio: bytes) -> str:
+    """Base64 audio for JSON responses (the services work in raw bytes)"""
+    return base64.b64encode(audio).decode('ascii')
+
+
+# Spoken acknowledgements that don't depend on the action's outcome; their
+# audio is synthesized while the action is still running
+PREFIX_TEMPLATES: Dict[IntentType, str] = {
+    IntentType.SET_ALARM: "Okay.",
+    IntentType.DELETE_ALARM: "Alright.",
+    IntentType.SEARCH_FLIGHTS: "Let me see.",
+}
+
 
 class Orchestrator:
     """
@@ -33,12 +51,18 @@ class Orchestrator:
     """
     
     def __init__(self):
+        # One OpenAI client (one HTTP/2 pool) shared by every stage
+        client = get_openai()
         self.stt_service = STTService()
         self.tts_service = TTSService()
-        self.intent_parser = IntentParser()
-        self.memory_service = MemoryService()
+        self.intent_parser = IntentParser(client)
+        self.memory_service = MemoryService(client)
         self.command_router = CommandRouter()
-        self.response_builder = ResponseBuilder()
+        self.response_builder = ResponseBuilder(client)
+        # Prefix audio is joined to the rest byte-wise, so only for formats that allow it
+        self._prefix_templates: Dict[IntentType, str] = (
+            dict(PREFIX_TEMPLATES) if self.tts_service.concatenable else {}
+        )
         
     async def process_conversation(
         self,
@@ -52,74 +76,186 @@ class Orchestrator:
             
         Returns:
             ConversationResponse with text and audio response
+            (audio only when request.want_audio is set)
         """
         try:
-            # Step 1: Get text from audio or direct input
-            text = await self._get_text_input(request)
-            logger.info(f"📝 User input: {text}")
+            response, prefix_audio_task, to_speak = await self._run_pipeline(request)
+            
+            # Step 7: Convert text to speech
+            if prefix_audio_task:
+                response.audio_response = await self._speak_with_prefix(prefix_audio_task, to_speak)
+            elif request.want_audio:
+                response.audio_response = _b64(await self.tts_service.text_to_speech(to_speak))
+            if response.audio_response is not None:
+                response.audio_mime_type = self.tts_service.mime_type(to_speak)
             
-            # Step 2: Parse intent and extract slots
-            intent = await self.intent_parser.parse(text)
-            logger.info(f"🎯 Detected intent: {intent.intent} (confidence: {intent.confidence})")
+            # Step 8: Return complete response
+            return response
+            
+        except Exception as e:
+            logger.error(f"❌ Orchestrator error: {e}", exc_info=True)
+            return await self._error_response(e, request.want_audio)
+    
+    async def process_conversation_stream(
+        self,
+        request: ConversationRequest
+    ) -> AsyncIterator[bytes]:
+        """
+        Process a conversation request, streaming the result as NDJSON
+        
+        The first line is the ConversationResponse without audio. If
+        request.want_audio is set, each following line is
+        {"audio": ..., "mime_type": ...} holding a base64 audio chunk, sent
+        as soon as that chunk is synthesized.
+        
+        Args:
+            request: ConversationRequest with audio or text
             
-            # Step 3: Fetch user memory and preferences
+        Yields:
+            NDJSON lines
+        """
+        try:
+            response, prefix_audio_task, to_speak = await self._run_pipeline(request)
+        except Exception as e:
+            logger.error(f"❌ Orchestrator error: {e}", exc_info=True)
+            response = await self._error_response(e, want_audio=False)
+            prefix_audio_task, to_speak = None, response.text_response
+        
+        yield orjson.dumps(response.model_dump(exclude={"audio_response", "audio_mime_type"})) + b"\n"
+        if not request.want_audio:
+            return
+        
+        if prefix_audio_task:
+            prefix_audio = await prefix_audio_task
+            if prefix_audio:
+                yield self._audio_line(prefix_audio, self.tts_service.mime_type(to_speak))
+        async for chunk, mime_type in self.tts_service.stream_speech(to_speak):
+            yield self._audio_line(chunk, mime_type)
+    
+    async def _run_pipeline(
+        self,
+        request: ConversationRequest
+    ) -> Tuple[ConversationResponse, Optional[asyncio.Task], str]:
+        """
+        Run everything up to speech synthesis
+        
+        Args:
+            request: ConversationRequest with audio or text
+            
+        Returns:
+            The response without audio, the speculative prefix audio task
+            (None if unused), and the text that still has to be spoken
+        """
+        # Step 1: Get text from audio or direct input
+        text = await self._get_text_input(request)
+        logger.info(f"📝 User input: {text}")
+        
+        # Step 2: Parse intent and extract slots
+        intent = await self.intent_parser.parse(text)
+        logger.info(f"🎯 Detected intent: {intent.intent} (confidence: {intent.confidence})")
+        
+        # Speculatively synthesize the acknowledgement while the action runs
+        prefix = self._prefix_templates.get(intent.intent) if request.want_audio else None
+        prefix_audio_task = (
+            asyncio.create_task(self.tts_service.text_to_speech(prefix))
+            if prefix else None
+        )
+        
+        # Step 3: Store conversation in memory (independent of the rest,
+        # and store_conversation logs its own failures)
+        store_task = asyncio.create_task(self.memory_service.store_conversation(
+            user_id=request.user_id,
+            text=text,
+            intent=intent.intent,
+            timestamp=datetime.utcnow()
+        ))
+        
+        try:
+            # Step 4: Fetch user memory and preferences
             user_context = await self.memory_service.get_user_context(
                 user_id=request.user_id,
                 intent=intent.intent
             )
             logger.info(f"🧠 Retrieved user context")
             
-            # Step 4: Store conversation in memory
-            await self.memory_service.store_conversation(
-                user_id=request.user_id,
-                text=text,
-                intent=intent.intent,
-                timestamp=datetime.utcnow()
-            )
-            
             # Step 5: Route to appropriate service and execute action
-            action_result = await self.command_router.route(
-                intent=intent,
-                user_id=request.user_id,
-                user_context=user_context
+            action_result, _ = await asyncio.gather(
+                self.command_router.route(
+                    intent=intent,
+                    user_id=request.user_id,
+                    user_context=user_context
+                ),
+                store_task
             )
             logger.info(f"✅ Action executed: {action_result.get('status')}")
             
             # Step 6: Build natural language response
-            text_response = await self.response_builder.build_response(
+            to_speak = await self.response_builder.build_response(
                 intent=intent,
                 action_result=action_result,
                 user_context=user_context
             )
-            logger.info(f"💬 Response: {text_response}")
-            
-            # Step 7: Convert text to speech
-            audio_response = await self.tts_service.text_to_speech(text_response)
-            
-            # Step 8: Return complete response
-            return ConversationResponse(
-                success=True,
-                transcription=text,  # ✅ Include what user said
-                text_response=text_response,
-                audio_response=audio_response,
-                intent=intent.intent.value,
-                confidence=intent.confidence,
-                data=action_result
-            )
-            
-        except Exception as e:
-            logger.error(f"❌ Orchestrator error: {e}", exc_info=True)
-            error_response = "I apologize, but I encountered an error processing your request. Please try again."
+        except BaseException:
+            # Includes cancellation; don't leave the speculative TTS call running
+            if prefix_audio_task:
+                prefix_audio_task.cancel()
+            raise
+        
+        if prefix_audio_task and action_result.get("status") == "success":
+            text_response = f"{prefix} {to_speak}"
+        else:
+            if prefix_audio_task:
+                prefix_audio_task.cancel()
+                prefix_audio_task = None
+            text_response = to_speak
+        logger.info(f"💬 Response: {text_response}")
+        
+        response = ConversationResponse(
+            success=True,
+            transcription=text,  # ✅ Include what user said
+            text_response=text_response,
+            intent=intent.intent.value,
+            confidence=intent.confidence,
+            data=action_result
+        )
+        return response, prefix_audio_task, to_speak
+    
+    async def _error_response(self, error: Exception, want_audio: bool) -> ConversationResponse:
+        """Build the apology response for a failed turn"""
+        error_response = "I apologize, but I encountered an error processing your request. Please try again."
+        
+        return ConversationResponse(
+            success=False,
+            transcription=None,  # ✅ Include transcription field
+            text_response=error_response,
+            audio_response=_b64(await self.tts_service.text_to_speech(error_response)) if want_audio else None,
+            audio_mime_type=self.tts_service.mime_type(error_response) if want_audio else None,
+            intent="error",
+            confidence=0.0,
+            data={"error": str(error)}
+        )
+    
+    @staticmethod
+    def _audio_line(chunk: bytes, mime_type: str) -> bytes:
+        """Encode an audio chunk and its MIME type as an NDJSON line"""
+        return orjson.dumps({"audio": _b64(chunk), "mime_type": mime_type}) + b"\n"
+    
+    async def _speak_with_prefix(self, prefix_audio_task: asyncio.Task, suffix: str) -> str:
+        """
+        Synthesize the suffix and append it to the speculative prefix audio
+        
+        Args:
+            prefix_audio_task: Task producing the prefix's audio bytes
+            suffix: Remaining response text
             
-            return ConversationResponse(
-                success=False,
-                transcription=None,  # ✅ Include transcription field
-                text_response=error_response,
-                audio_response=await self.tts_service.text_to_speech(error_response),
-                intent="error",
-                confidence=0.0,
-                data={"error": str(e)}
-            )
+        Returns:
+            Base64 encoded audio (only used for concatenable formats)
+        """
+        prefix_audio, suffix_audio = await asyncio.gather(
+            prefix_audio_task,
+            self.tts_service.text_to_speech(suffix)
+        )
+        return _b64(prefix_audio + suffix_audio)
     
     async def _get_text_input(self, request: ConversationRequest) -> str:
         """
@@ -135,12 +271,18 @@ class Orchestrator:
             return request.text
         
         if request.audio:
-            # Convert base64 audio to text using STT
-            text = await self.stt_service.speech_to_text(request.audio)
+            # Decode the base64 audio (JSON boundary) and convert it to text
+            text = await self.stt_service.speech_to_text(base64.b64decode(request.audio))
             return text
         
         raise ValueError("Either 'text' or 'audio' must be provided")
 
 
+@lru_cache(maxsize=1)
+def get_orchestrator() -> Orchestrator:
+    """Get the shared Orchestrator instance"""
+    return Orchestrator()
+
+
 # Singleton instance
-orchestrator = Orchestrator()
+orchestrator = get_orchestrator()
@@ -0,0 +1,176 @@
+"""
+Reminder Store - Redis-backed storage for Firebase devices and reminders
+"""
+import logging
+import time
+from datetime import datetime
+from typing import Dict, List, Optional, Any
+import orjson
+import redis.asyncio as redis
+
+from app.core.redis_client import get_redis
+
+logger = logging.getLogger(__name__)
+
+# Registrations and reminders expire on their own, mirroring expires_at
+DEVICE_TTL = 30 * 86400  # seconds
+REMINDER_TTL = 30 * 86400  # seconds
+
+# Sent, cancelled and failed reminders are kept this long, then swept
+TERMINAL_STATUSES = frozenset({"sent", "cancelled", "failed"})
+TERMINAL_RETENTION = 86400  # seconds
+
+
+class ReminderStore:
+    """
+    Thin DAO over Redis for device registrations and reminders
+
+    Layout per user:
+        devices:{user_id}             hash  device_id -> device JSON
+        reminders:{user_id}           hash  reminder_id -> reminder JSON
+        reminders:{user_id}:by_time   zset  reminder_id scored by scheduled time
+        reminders:{user_id}:done      zset  reminder_id scored by completion time
+
+    Terminal reminders are swept lazily on the user's next write.
+    """
+
+    def __init__(self, client: Optional[redis.Redis] = None):
+        self.redis = client or get_redis()
+
+    @staticmethod
+    def _devices_key(user_id: str) -> str:
+        return f"devices:{user_id}"
+
+    @staticmethod
+    def _reminders_key(user_id: str) -> str:
+        return f"reminders:{user_id}"
+
+    @staticmethod
+    def _schedule_key(user_id: str) -> str:
+        return f"reminders:{user_id}:by_time"
+
+    @staticmethod
+    def _done_key(user_id: str) -> str:
+        return f"reminders:{user_id}:done"
+
+    async def _sweep(self, user_id: str):
+        """Drop terminal reminders older than TERMINAL_RETENTION"""
+        cutoff = time.time() - TERMINAL_RETENTION
+        expired = await self.redis.zrangebyscore(self._done_key(user_id), "-inf", cutoff)
+        if not expired:
+            return
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hdel(self._reminders_key(user_id), *expired)
+            pipe.zrem(self._schedule_key(user_id), *expired)
+            pipe.zrem(self._done_key(user_id), *expired)
+            await pipe.execute()
+
+    async def put_device(self, device: Dict[str, Any]):
+        """Store a device registration and refresh its expiry"""
+        key = self._devices_key(device["user_id"])
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(key, device["device_id"], orjson.dumps(device))
+            pipe.expire(key, DEVICE_TTL)
+            await pipe.execute()
+
+    async def list_devices(self, user_id: str) -> List[Dict[str, Any]]:
+        """Get all registered devices for a user"""
+        raw = await self.redis.hvals(self._devices_key(user_id))
+        return [orjson.loads(item) for item in raw]
+
+    async def put(self, reminder: Dict[str, Any], score: Optional[float] = None):
+        """
+        Store a reminder and index it by scheduled time
+
+        Args:
+            reminder: Reminder dict
+            score: Scheduled time as a Unix timestamp (parsed from the
+                reminder's scheduled_time if not given)
+        """
+        user_id = reminder["user_id"]
+        if score is None:
+            score = datetime.fromisoformat(reminder["scheduled_time"]).timestamp()
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(self._reminders_key(user_id), reminder["reminder_id"], orjson.dumps(reminder))
+            pipe.zadd(self._schedule_key(user_id), {reminder["reminder_id"]: score})
+            pipe.expire(self._reminders_key(user_id), REMINDER_TTL)
+            pipe.expire(self._schedule_key(user_id), REMINDER_TTL)
+            await pipe.execute()
+        await self._sweep(user_id)
+
+    async def get(self, user_id: str, reminder_id: str) -> Optional[Dict[str, Any]]:
+        """Get a single reminder"""
+        raw = await self.redis.hget(self._reminders_key(user_id), reminder_id)
+        return orjson.loads(raw) if raw else None
+
+    async def update(self, user_id: str, reminder_id: str, **fields) -> bool:
+        """
+        Merge fields into a stored reminder
+
+        Returns:
+            False if the reminder no longer exists
+        """
+        reminder = await self.get(user_id, reminder_id)
+        if reminder is None:
+            return False
+        reminder.update(fields)
+        async with self.redis.pipeline(transaction=False) as pipe:
+            pipe.hset(self._reminders_key(user_id), reminder_id, orjson.dumps(reminder))
+            if reminder.get("status") in TERMINAL_STATUSES:
+                pipe.zadd(self._done_key(user_id), {reminder_id: time.time()})
+                pipe.expire(self._done_key(user_id), REMINDER_TTL)
+            await pipe.execute()
+        return True
+
+    async def update_status(self, user_id: str, reminder_id: str, status: str, **fields) -> bool:
+        """Set a reminder's status along with any extra fields"""
+        return await self.update(user_id, reminder_id, status=status, **fields)
+
+    async def list_scheduled(self) -> List[Dict[str, Any]]:
+        """
+        Get every reminder still in "scheduled" status, across all users
+
+        Walks the by_time indexes with SCAN, so it is meant for startup only.
+        """
+        prefix, suffix = len("reminders:"), len(":by_time")
+        pending = []
+        async for key in self.redis.scan_iter(match="reminders:*:by_time", count=500):
+            ids = await self.redis.zrange(key, 0, -1)
+            if not ids:
+                continue
+            user_id = key.decode()[prefix:-suffix]
+            raw = await self.redis.hmget(self._reminders_key(user_id), ids)
+            for item in raw:
+                if not item:
+                    continue
+                reminder = orjson.loads(item)
+                if reminder.get("status") == "scheduled":
+                    pending.append(reminder)
+        return pending
+
+    async def list_by_user(
+        self,
+        user_id: str,
+        start: Optional[datetime] = None,
+        end: Optional[datetime] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Get a user's reminders ordered by scheduled time
+
+        Args:
+            user_id: User identifier
+            start: Only reminders scheduled at or after this time
+            end: Only reminders scheduled at or before this time
+
+        Returns:
+            List of reminder dicts
+        """
+        ids = await self.redis.zrangebyscore(
+            self._schedule_key(user_id),
+            start.timestamp() if start else "-inf",
+            end.timestamp() if end else "+inf"
+        )
+        if not ids:
+            return []
+        raw = await self.redis.hmget(self._reminders_key(user_id), ids)
+        return [orjson.loads(item) for item in raw if item]
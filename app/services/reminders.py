@@ -2,18 +2,81 @@
 Reminders and Alarms Service
 Manages alarm creation, scheduling, and notifications
 """
+import asyncio
 import logging
-from typing import Dict, Any, Optional
+from typing import Dict, Any, List, Optional, Union
+from functools import lru_cache
 from datetime import datetime, timedelta
 from dateutil import parser
 import pytz
+from bson import ObjectId, encode
+from bson.raw_bson import RawBSONDocument
+from pymongo import ReturnDocument
+from pymongo.errors import BulkWriteError
+from pymongo.write_concern import WriteConcern
 
+from app.core.batching import MicroBatcher
 from app.core.database import get_database
+from app.core.log_sampling import should_log_tb
 from app.services.scheduler import scheduler
 
 logger = logging.getLogger(__name__)
 
 
+@lru_cache(maxsize=512)
+def _get_tz(name: str):
+    """Get a pytz timezone by IANA name (cached, pytz zones are immutable)"""
+    return pytz.timezone(name)
+
+
+# strptime formats tried before falling back to dateutil
+_TIME_FORMATS_12H = ("%I:%M %p", "%I:%M%p", "%I %p", "%I%p")
+_TIME_FORMATS_24H = ("%H:%M",)
+
+
+def _parse_clock_time(time_str: str) -> datetime:
+    """
+    Parse an uppercase clock time ("6:00 AM", "7PM", "18:30")
+    
+    Raises:
+        ValueError: If no format (including dateutil's) matches
+    """
+    formats = _TIME_FORMATS_12H if ("AM" in time_str or "PM" in time_str) else _TIME_FORMATS_24H
+    for fmt in formats:
+        try:
+            return datetime.strptime(time_str, fmt)
+        except ValueError:
+            continue
+    return parser.parse(time_str)
+
+
+def _next_occurrence(hour: int, minute: int, tz, now: datetime) -> datetime:
+    """
+    Next time the wall clock in `tz` reads hour:minute, in UTC
+    
+    Args:
+        hour: Hour (0-23)
+        minute: Minute
+        tz: pytz timezone
+        now: Current time, already in `tz`
+    """
+    # If the wall-clock time has passed today, set for tomorrow
+    # (compared on local wall time, so only one localize is needed)
+    rollover = (hour, minute) <= (now.hour, now.minute)
+    day = now.date() + timedelta(days=rollover)
+    alarm_dt = tz.localize(datetime(day.year, day.month, day.day, hour, minute))
+    
+    # Convert to UTC for storage
+    return alarm_dt.astimezone(pytz.UTC)
+
+
+# Alarm inserts are buffered and written with insert_many
+ALARM_INSERT_MAX_ROWS = 256
+ALARM_INSERT_WAIT = 0.05  # seconds
+
+TRIGGER_WRITE_CONCERN = WriteConcern(w=1)
+
+
 class RemindersService:
     """
     Service for managing alarms and reminders
@@ -21,6 +84,7 @@ class RemindersService:
     
     def __init__(self):
         self.db = None
+        self.insert_batcher = MicroBatcher(self._insert_alarms, ALARM_INSERT_MAX_ROWS, ALARM_INSERT_WAIT)
     
     def _get_db(self):
         """Lazy load database"""
@@ -28,10 +92,35 @@ class RemindersService:
             self.db = get_database()
         return self.db
     
+    async def _insert_alarms(self, docs: List[RawBSONDocument]) -> List[Optional[Exception]]:
+        """
+        Write one batch of alarms with a single insert_many
+        
+        Args:
+            docs: Documents with client-side _ids (pymongo can't add one to RawBSONDocument)
+            
+        Returns:
+            None per written document, the write error for the rest
+        """
+        errors: Dict[int, Exception] = {}
+        try:
+            await self._get_db().alarms.insert_many(docs, ordered=False)
+        except BulkWriteError as e:
+            # Unordered: everything except the reported indexes was written
+            for write_error in e.details.get("writeErrors", []):
+                errors[write_error["index"]] = Exception(write_error.get("errmsg", "write error"))
+        except Exception as e:
+            errors = {i: e for i in range(len(docs))}
+        
+        if errors:
+            logger.error(f"❌ Alarm batch insert: {len(errors)}/{len(docs)} failed")
+        
+        return [errors.get(i) for i in range(len(docs))]
+    
     async def set_alarm(
         self,
         user_id: str,
-        time: str,
+        time: Union[str, datetime],
         timezone: str = "UTC",
         repeat: bool = False,
         label: Optional[str] = None
@@ -41,8 +130,8 @@ class RemindersService:
         
         Args:
             user_id: User identifier
-            time: Alarm time (e.g., "6:00 AM", "18:30")
-            timezone: User's timezone
+            time: Alarm time (e.g., "6:00 AM", "18:30") or a datetime
+            timezone: User's timezone (applied to naive datetimes)
             repeat: Whether alarm repeats daily
             label: Optional alarm label
             
@@ -50,8 +139,19 @@ class RemindersService:
             Result with alarm details
         """
         try:
-            # Parse time string
-            alarm_time = self._parse_alarm_time(time, timezone)
+            # One clock read per alarm, shared by parsing and created_at
+            now = datetime.now(pytz.UTC)
+            
+            # Use datetimes as given, parse time strings
+            if isinstance(time, datetime):
+                alarm_time = self._normalize_alarm_time(time, timezone)
+                if alarm_time <= now:
+                    # A past datetime would be dropped by the scheduler; roll it
+                    # forward to the next occurrence of its clock time, as strings are
+                    tz = _get_tz(timezone)
+                    alarm_time = _next_occurrence(time.hour, time.minute, tz, now.astimezone(tz))
+            else:
+                alarm_time = self._parse_alarm_time(time, timezone, now)
             
             if not alarm_time:
                 return {
@@ -59,24 +159,30 @@ class RemindersService:
                     "message": "I couldn't understand that time format. Please try again."
                 }
             
-            # Store alarm in database
-            db = self._get_db()
+            # Store alarm in database (the _id is generated here so the job
+            # can be scheduled without waiting for the insert)
+            alarm_oid = ObjectId()
+            alarm_id = str(alarm_oid)
             alarm_doc = {
+                "_id": alarm_oid,
                 "user_id": user_id,
                 "alarm_time": alarm_time,
                 "repeat": repeat,
                 "label": label,
                 "active": True,
-                "created_at": datetime.utcnow()
+                "created_at": now
             }
             
-            result = await db.alarms.insert_one(alarm_doc)
-            alarm_id = str(result.inserted_id)
-            
-            # Schedule the alarm
-            self._schedule_alarm(alarm_id, user_id, alarm_time)
+            # Schedule the alarm, then wait for the batched insert
+            await self._schedule_alarm(alarm_id, user_id, alarm_time)
+            try:
+                # Encoded once here; insert_many then copies the raw bytes as-is
+                await self.insert_batcher.submit(RawBSONDocument(encode(alarm_doc)))
+            except Exception:
+                await self._unschedule_alarm(alarm_id)
+                raise
             
-            logger.info(f"✅ Alarm set for {user_id} at {alarm_time}")
+            logger.info("✅ Alarm set for %s at %s", user_id, alarm_time)
             
             return {
                 "status": "success",
@@ -86,68 +192,97 @@ class RemindersService:
             }
             
         except Exception as e:
-            logger.error(f"❌ Error setting alarm: {e}", exc_info=True)
+            logger.error("❌ Error setting alarm: %s", e, exc_info=should_log_tb())
             return {
                 "status": "error",
                 "message": "Failed to set alarm. Please try again."
             }
     
-    def _parse_alarm_time(self, time_str: str, timezone: str) -> Optional[datetime]:
+    async def set_alarms_bulk(
+        self,
+        user_id: str,
+        specs: List[Dict[str, Any]]
+    ) -> List[Dict[str, Any]]:
+        """
+        Set several alarms concurrently
+        
+        The inserts land in the same insert_many batch and the jobs are
+        scheduled without waiting on each other.
+        
+        Args:
+            user_id: User identifier
+            specs: set_alarm keyword arguments per alarm (time, timezone, repeat, label)
+            
+        Returns:
+            One set_alarm result per spec, in order
+        """
+        return list(await asyncio.gather(*(self.set_alarm(user_id, **spec) for spec in specs)))
+    
+    def _normalize_alarm_time(self, alarm_dt: datetime, timezone: str) -> datetime:
+        """
+        Convert a datetime to UTC, treating naive values as user's timezone
+        
+        Args:
+            alarm_dt: Alarm datetime
+            timezone: Timezone string
+            
+        Returns:
+            Timezone-aware UTC datetime
+        """
+        if alarm_dt.tzinfo is None:
+            alarm_dt = _get_tz(timezone).localize(alarm_dt)
+        return alarm_dt.astimezone(pytz.UTC)
+    
+    def _parse_alarm_time(
+        self,
+        time_str: str,
+        timezone: str,
+        now: Optional[datetime] = None
+    ) -> Optional[datetime]:
         """
         Parse time string to datetime
         
         Args:
             time_str: Time string (e.g., "6:00 AM", "18:30")
             timezone: Timezone string
+            now: Current time (aware), read from the clock if not given
             
         Returns:
             Datetime object or None
         """
         try:
             # Get user's timezone
-            tz = pytz.timezone(timezone)
-            now = datetime.now(tz)
+            tz = _get_tz(timezone)
+            now = now.astimezone(tz) if now else datetime.now(tz)
             
             # Parse time
             time_str = time_str.strip().upper()
             
             # Handle common formats
-            if "AM" in time_str or "PM" in time_str:
-                # 12-hour format
-                parsed = parser.parse(time_str)
-            else:
-                # 24-hour format
-                parsed = parser.parse(time_str)
-            
-            # Combine with today's date
-            alarm_dt = tz.localize(datetime(
-                now.year, now.month, now.day,
-                parsed.hour, parsed.minute
-            ))
+            parsed = _parse_clock_time(time_str)
             
-            # If time has passed today, set for tomorrow
-            if alarm_dt <= now:
-                alarm_dt += timedelta(days=1)
-            
-            # Convert to UTC for storage
-            return alarm_dt.astimezone(pytz.UTC)
+            return _next_occurrence(parsed.hour, parsed.minute, tz, now)
             
         except Exception as e:
             logger.error(f"❌ Time parsing error: {e}")
             return None
     
-    def _schedule_alarm(self, alarm_id: str, user_id: str, alarm_time: datetime):
+    async def _schedule_alarm(self, alarm_id: str, user_id: str, alarm_time: datetime):
         """
         Schedule alarm using APScheduler
         
+        The job store write is blocking Redis/Mongo I/O, so it runs in a
+        thread (add_job is thread-safe and wakes the scheduler on its loop).
+        
         Args:
             alarm_id: Alarm ID
             user_id: User ID
             alarm_time: When to trigger
         """
         try:
-            scheduler.add_job(
-                func=self._trigger_alarm,
+            await asyncio.to_thread(
+                scheduler.add_job,
+                func=trigger_alarm,
                 trigger='date',
                 run_date=alarm_time,
                 args=[alarm_id, user_id],
@@ -158,6 +293,13 @@ class RemindersService:
         except Exception as e:
             logger.error(f"❌ Scheduling error: {e}")
     
+    async def _unschedule_alarm(self, alarm_id: str):
+        """Remove an alarm's job if it is scheduled"""
+        try:
+            await asyncio.to_thread(scheduler.remove_job, f"alarm_{alarm_id}")
+        except Exception:
+            pass
+    
     async def _trigger_alarm(self, alarm_id: str, user_id: str):
         """
         Trigger alarm - send push notification
@@ -167,20 +309,21 @@ class RemindersService:
             user_id: User ID
         """
         try:
-            logger.info(f"⏰ Triggering alarm {alarm_id} for user {user_id}")
+            logger.info("⏰ Triggering alarm %s for user %s", alarm_id, user_id)
             
             # TODO: Send push notification to user's device
             # This would use Firebase Cloud Messaging (FCM)
             
-            # Mark alarm as triggered
-            db = self._get_db()
-            await db.alarms.update_one(
-                {"_id": alarm_id},
-                {"$set": {"triggered_at": datetime.utcnow()}}
+            # Mark alarm as triggered (a lost timestamp is harmless, so w=1)
+            alarms = self._get_db().alarms.with_options(write_concern=TRIGGER_WRITE_CONCERN)
+            await alarms.update_one(
+                {"_id": ObjectId(alarm_id)},
+                {"$set": {"triggered_at": datetime.utcnow()}},
+                upsert=False
             )
             
         except Exception as e:
-            logger.error(f"❌ Error triggering alarm: {e}")
+            logger.error("❌ Error triggering alarm: %s", e)
     
     async def delete_recent_alarm(self, user_id: str) -> Dict[str, Any]:
         """
@@ -195,10 +338,13 @@ class RemindersService:
         try:
             db = self._get_db()
             
-            # Find most recent active alarm
-            alarm = await db.alarms.find_one(
+            # Deactivate the most recent active alarm in one atomic round-trip
+            alarm = await db.alarms.find_one_and_update(
                 {"user_id": user_id, "active": True},
-                sort=[("created_at", -1)]
+                {"$set": {"active": False}},
+                sort=[("created_at", -1)],
+                projection={"_id": 1},
+                return_document=ReturnDocument.BEFORE
             )
             
             if not alarm:
@@ -207,18 +353,9 @@ class RemindersService:
                     "message": "You don't have any active alarms."
                 }
             
-            # Deactivate alarm
-            await db.alarms.update_one(
-                {"_id": alarm["_id"]},
-                {"$set": {"active": False}}
-            )
-            
             # Remove from scheduler
             alarm_id = str(alarm["_id"])
-            try:
-                scheduler.remove_job(f"alarm_{alarm_id}")
-            except:
-                pass
+            await self._unschedule_alarm(alarm_id)
             
             logger.info(f"✅ Deleted alarm {alarm_id}")
             
@@ -242,3 +379,14 @@ class RemindersService:
         ).sort("alarm_time", 1).to_list(length=100)
         
         return alarms
+
+
+@lru_cache(maxsize=1)
+def get_reminders_service() -> RemindersService:
+    """Get the shared RemindersService instance"""
+    return RemindersService()
+
+
+async def trigger_alarm(alarm_id: str, user_id: str):
+    """Module-level alarm job target (persistent job stores need an importable reference)"""
+    await get_reminders_service()._trigger_alarm(alarm_id, user_id)
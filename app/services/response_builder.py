@@ -1,23 +1,46 @@
 """
 Response Builder - Creates natural language responses using LLM
 """
+import hashlib
 import logging
-from typing import Dict, Any
+from typing import Dict, Any, Optional
+from cachetools import LRUCache
 from openai import AsyncOpenAI
 
 from app.core.config import settings
+from app.core.openai_client import get_openai
 from app.models.schemas import Intent, IntentType
 
 logger = logging.getLogger(__name__)
 
+# Rendered flight blurbs keyed by a hash of their prompt (~200 B each)
+FLIGHT_BLURB_CACHE_SIZE = 2048
+
+JARVIS_SYSTEM_MESSAGE = {"role": "system", "content": "You are Jarvis, a helpful and concise AI assistant."}
+
+FLIGHT_PROMPT_TEMPLATE = """You are Jarvis, an AI assistant. Present these flight options in a natural, conversational way.
+
+Flight search: {source} to {destination} on {date}
+
+Available flights:
+{flights}
+
+Create a brief, helpful response (2-3 sentences) highlighting the best option."""
+
 
 class ResponseBuilder:
     """
     Builds natural, Jarvis-style responses using LLM
     """
     
-    def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+    def __init__(self, client: Optional[AsyncOpenAI] = None):
+        self.client = client or get_openai()
+        self._flight_blurbs: LRUCache = LRUCache(maxsize=FLIGHT_BLURB_CACHE_SIZE)
+        self._handlers = {
+            IntentType.SET_ALARM: self._build_alarm_response,
+            IntentType.DELETE_ALARM: self._build_delete_alarm_response,
+            IntentType.SEARCH_FLIGHTS: self._build_flight_response,
+        }
     
     async def build_response(
         self,
@@ -47,29 +70,22 @@ class ResponseBuilder:
                 return action_result.get("message", "I need more information.")
             
             # Build context-aware response
-            if intent.intent == IntentType.SET_ALARM:
-                return self._build_alarm_response(action_result)
-            
-            elif intent.intent == IntentType.DELETE_ALARM:
-                return self._build_delete_alarm_response(action_result)
-            
-            elif intent.intent == IntentType.SEARCH_FLIGHTS:
-                return await self._build_flight_response(action_result, user_context)
-            
-            else:
+            handler = self._handlers.get(intent.intent)
+            if handler is None:
                 return "I've processed your request."
+            return await handler(action_result, user_context)
                 
         except Exception as e:
             logger.error(f"❌ Response building error: {e}")
             return "I've completed that task for you."
     
-    def _build_alarm_response(self, result: Dict[str, Any]) -> str:
+    async def _build_alarm_response(self, result: Dict[str, Any], user_context: Dict[str, Any]) -> str:
         """Build response for alarm setting"""
         if result.get("status") == "success":
             return result.get("message", "Your alarm has been set.")
         return "I couldn't set the alarm. Please try again."
     
-    def _build_delete_alarm_response(self, result: Dict[str, Any]) -> str:
+    async def _build_delete_alarm_response(self, result: Dict[str, Any], user_context: Dict[str, Any]) -> str:
         """Build response for alarm deletion"""
         return result.get("message", "Alarm deleted.")
     
@@ -88,27 +104,15 @@ class ResponseBuilder:
             return f"I couldn't find any flights from {result.get('source')} to {result.get('destination')} on {result.get('date')}."
         
         # Build natural response using LLM
-        prompt = f"""You are Jarvis, an AI assistant. Present these flight options in a natural, conversational way.
-
-Flight search: {result.get('source')} to {result.get('destination')} on {result.get('date')}
-
-Available flights:
-{self._format_flights_for_llm(flights)}
-
-Create a brief, helpful response (2-3 sentences) highlighting the best option."""
+        prompt = FLIGHT_PROMPT_TEMPLATE.format(
+            source=result.get('source'),
+            destination=result.get('destination'),
+            date=result.get('date'),
+            flights=self._format_flights_for_llm(flights)
+        )
 
         try:
-            response = await self.client.chat.completions.create(
-                model=settings.DEFAULT_LLM_MODEL,
-                messages=[
-                    {"role": "system", "content": "You are Jarvis, a helpful and concise AI assistant."},
-                    {"role": "user", "content": prompt}
-                ],
-                temperature=0.7,
-                max_tokens=150
-            )
-            
-            return response.choices[0].message.content.strip()
+            return await self._llm_flight_blurb(prompt)
             
         except Exception as e:
             logger.error(f"❌ LLM response error: {e}")
@@ -116,20 +120,36 @@ Create a brief, helpful response (2-3 sentences) highlighting the best option.""
             best_flight = flights[0]
             return f"I found {len(flights)} flights. The best option is {best_flight['airline']} at {best_flight['departure_time']} for ₹{best_flight['price']:,}, {best_flight['duration']} duration."
     
+    async def _llm_flight_blurb(self, prompt: str) -> str:
+        """Render a flight prompt with the LLM, reusing results for identical prompts"""
+        prompt_hash = hashlib.blake2b(prompt.encode(), digest_size=16).hexdigest()
+        cached = self._flight_blurbs.get(prompt_hash)
+        if cached is not None:
+            logger.info("⚡ Flight response cache hit")
+            return cached
+        
+        response = await self.client.chat.completions.create(
+            model=settings.DEFAULT_LLM_MODEL,
+            messages=[JARVIS_SYSTEM_MESSAGE, {"role": "user", "content": prompt}],
+            temperature=0.7,
+            max_tokens=150
+        )
+        
+        blurb = response.choices[0].message.content.strip()
+        self._flight_blurbs[prompt_hash] = blurb
+        return blurb
+    
     def _format_flights_for_llm(self, flights: list) -> str:
         """Format flight data for LLM"""
-        lines = []
-        for i, flight in enumerate(flights[:3], 1):
-            stops_text = 'non-stop' if flight['direct'] else f"{flight['stops']} stop(s)"
-            lines.append(
-                f"{i}. {flight['airline']} {flight['flight_number']}: "
-                f"Departs {flight['departure_time']}, "
-                f"arrives {flight['arrival_time']}, "
-                f"₹{flight['price']:,}, "
-                f"{flight['duration']}, "
-                f"{stops_text}"
-            )
-        return "\n".join(lines)
+        return "\n".join(
+            f"{i}. {f['airline']} {f['flight_number']}: "
+            f"Departs {f['departure_time']}, "
+            f"arrives {f['arrival_time']}, "
+            f"₹{f['price']:,}, "
+            f"{f['duration']}, "
+            f"{'non-stop' if f['direct'] else str(f['stops']) + ' stop(s)'}"
+            for i, f in enumerate(flights[:3], 1)
+        )
     
     def _build_error_response(self, result: Dict[str, Any]) -> str:
         """Build error response"""
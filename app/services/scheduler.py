@@ -3,19 +3,48 @@ Task Scheduler using APScheduler
 Manages background jobs for alarms and reminders
 """
 from apscheduler.schedulers.asyncio import AsyncIOScheduler
-from apscheduler.jobstores.memory import MemoryJobStore
+from apscheduler.jobstores.redis import RedisJobStore
+from redis import ConnectionPool
 import logging
 
+from app.core.config import get_settings
+
 logger = logging.getLogger(__name__)
 
+
+def _build_jobstore():
+    """
+    Persistent job store, so jobs survive restarts and are loaded by next
+    run time rather than all at once (Redis zset or Mongo next_run_time index)
+    """
+    settings = get_settings()
+    if settings.SCHEDULER_JOBSTORE == "mongodb":
+        from apscheduler.jobstores.mongodb import MongoDBJobStore
+        return MongoDBJobStore(
+            database=settings.MONGODB_DB_NAME,
+            collection="apscheduler_jobs",
+            host=settings.MONGODB_URL
+        )
+    return RedisJobStore(connection_pool=ConnectionPool.from_url(settings.REDIS_URL))
+
+
 # Job stores
 jobstores = {
-    'default': MemoryJobStore()
+    'default': _build_jobstore()
+}
+
+# Collapse firings missed during a restart into one run, and don't drop
+# jobs that are only slightly late
+job_defaults = {
+    'coalesce': True,
+    'max_instances': 4,
+    'misfire_grace_time': 60
 }
 
 # Scheduler configuration
 scheduler = AsyncIOScheduler(
     jobstores=jobstores,
+    job_defaults=job_defaults,
     timezone='UTC'
 )
 
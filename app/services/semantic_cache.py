@@ -0,0 +1,69 @@
+"""
+Semantic Cache - Reuse results for queries that mean the same thing
+"""
+import time
+from typing import Any, List, Optional, Sequence
+import numpy as np
+
+
+class SemanticCache:
+    """
+    In-process nearest-neighbour cache over normalized embeddings
+
+    A lookup returns the value stored for the most similar vector if its
+    cosine similarity reaches `threshold` and the entry is younger than
+    `ttl`. The oldest entry is evicted once `maxsize` is reached.
+    """
+
+    def __init__(self, threshold: float, ttl: float, maxsize: int = 1024):
+        self.threshold = threshold
+        self.ttl = ttl
+        self.maxsize = maxsize
+        # Ring buffer, allocated on the first put once the dimension is known;
+        # slot _next is overwritten next, so the oldest entry goes first
+        self._vectors: Optional[np.ndarray] = None  # (maxsize, d) float32
+        self._values: List[Any] = [None] * maxsize
+        self._stored_at = np.full(maxsize, -np.inf)
+        self._valid = np.zeros(maxsize, dtype=bool)
+        self._next = 0
+        self._filled = 0  # slots written at least once (a prefix of the buffer)
+
+    def __len__(self) -> int:
+        return int(self._valid.sum())
+
+    @staticmethod
+    def _normalize(vector: Sequence[float]) -> np.ndarray:
+        v = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(v)
+        return v / norm if norm else v
+
+    def _expire(self):
+        """Invalidate entries older than ttl"""
+        cutoff = time.monotonic() - self.ttl
+        self._valid[:self._filled] &= self._stored_at[:self._filled] >= cutoff
+
+    def get(self, vector: Sequence[float]) -> Optional[Any]:
+        """Return the cached value for the closest vector, or None"""
+        if self._vectors is None:
+            return None
+        self._expire()
+        n = self._filled
+        scores = self._vectors[:n] @ self._normalize(vector)
+        scores[~self._valid[:n]] = -np.inf
+        best = int(np.argmax(scores))
+        if scores[best] >= self.threshold:
+            return self._values[best]
+        return None
+
+    def put(self, vector: Sequence[float], value: Any):
+        """Cache a value under its embedding, overwriting the oldest slot when full"""
+        row = self._normalize(vector)
+        if self._vectors is None:
+            self._vectors = np.zeros((self.maxsize, row.shape[0]), dtype=np.float32)
+        slot = self._next
+        self._vectors[slot] = row
+        self._values[slot] = value
+        self._stored_at[slot] = time.monotonic()
+        self._valid[slot] = True
+        self._next = (slot + 1) % self.maxsize
+        self._filled = max(self._filled, slot + 1)
@@ -3,12 +3,10 @@ Speech-to-Text Service
 Converts audio to text using OpenAI Whisper or Deepgram
 """
 import logging
-import base64
-import tempfile
-import os
-from openai import AsyncOpenAI
 
 from app.core.config import settings
+from app.core.log_sampling import should_log_tb
+from app.core.openai_client import get_openai
 
 logger = logging.getLogger(__name__)
 
@@ -19,44 +17,30 @@ class STTService:
     """
     
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = get_openai()
     
-    async def speech_to_text(self, audio_base64: str) -> str:
+    async def speech_to_text(self, audio: bytes) -> str:
         """
         Convert audio to text
         
         Args:
-            audio_base64: Base64 encoded audio data
+            audio: Raw audio bytes (decode base64 at the API boundary)
             
         Returns:
             Transcribed text
         """
         try:
-            # Decode base64 audio
-            audio_data = base64.b64decode(audio_base64)
+            # Upload straight from memory; the filename tells Whisper the format
+            transcript = await self.client.audio.transcriptions.create(
+                model=settings.DEFAULT_STT_MODEL,
+                file=("audio.wav", audio),
+                language="en"
+            )
             
-            # Save to temporary file
-            with tempfile.NamedTemporaryFile(suffix=".wav", delete=False) as temp_file:
-                temp_file.write(audio_data)
-                temp_path = temp_file.name
-            
-            try:
-                # Transcribe using Whisper
-                with open(temp_path, "rb") as audio_file:
-                    transcript = await self.client.audio.transcriptions.create(
-                        model=settings.DEFAULT_STT_MODEL,
-                        file=audio_file,
-                        language="en"
-                    )
-                
-                text = transcript.text
-                logger.info(f"✅ Transcribed: {text}")
-                return text
-                
-            finally:
-                # Clean up temp file
-                os.unlink(temp_path)
+            text = transcript.text
+            logger.info("✅ Transcribed: %s", text)
+            return text
                 
         except Exception as e:
-            logger.error(f"❌ STT error: {e}", exc_info=True)
+            logger.error("❌ STT error: %s", e, exc_info=should_log_tb())
             raise ValueError("Failed to transcribe audio")
@@ -1,15 +1,79 @@
 """
 Text-to-Speech Service
-Converts text to speech using OpenAI TTS
+Converts text to speech using OpenAI TTS, or a local Piper voice for short replies
 """
+import asyncio
+import io
 import logging
-import base64
-from openai import AsyncOpenAI
+import re
+import wave
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+from typing import AsyncIterator, Optional, Tuple
+from cachetools import LRUCache
 
 from app.core.config import settings
+from app.core.log_sampling import should_log_tb
+from app.core.openai_client import get_openai
 
 logger = logging.getLogger(__name__)
 
+# Import Piper if a local voice is configured
+if settings.LOCAL_TTS_MODEL:
+    try:
+        from piper import PiperVoice
+        LOCAL_TTS_AVAILABLE = True
+    except ImportError:
+        LOCAL_TTS_AVAILABLE = False
+        logger.warning("⚠️ piper-tts not installed, local TTS disabled")
+else:
+    LOCAL_TTS_AVAILABLE = False
+
+LOCAL_TTS_WORKERS = 2
+TTS_CACHE_SIZE = 1024  # synthesized clips keyed by (voice, text)
+
+# Sent alongside the audio so clients know which decoder to use
+AUDIO_MIME_TYPES = {
+    "mp3": "audio/mpeg",
+    "opus": "audio/ogg",
+    "aac": "audio/aac",
+    "flac": "audio/flac",
+    "wav": "audio/wav",
+}
+
+# Piper voice loaded once per worker process
+_local_voice = None
+
+
+def _load_local_voice(model_path: str):
+    """Process pool initializer: load the Piper voice"""
+    global _local_voice
+    _local_voice = PiperVoice.load(model_path)
+
+
+@lru_cache(maxsize=1)
+def _get_local_pool() -> Optional[ProcessPoolExecutor]:
+    """Worker pool shared by every TTSService (None without a local voice)"""
+    if not LOCAL_TTS_AVAILABLE:
+        return None
+    return ProcessPoolExecutor(
+        max_workers=LOCAL_TTS_WORKERS,
+        initializer=_load_local_voice,
+        initargs=(settings.LOCAL_TTS_MODEL,)
+    )
+
+
+def _synthesize_local(text: str) -> bytes:
+    """Synthesize text to WAV bytes in a worker process"""
+    buf = io.BytesIO()
+    with wave.open(buf, "wb") as wav_file:
+        _local_voice.synthesize(text, wav_file)
+    return buf.getvalue()
+
+
+# Sentence boundaries for chunked synthesis
+_SENTENCE_SPLIT_RE = re.compile(r"(?<=[.!?])\s+")
+
 
 class TTSService:
     """
@@ -17,9 +81,29 @@ class TTSService:
     """
     
     def __init__(self):
-        self.client = AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+        self.client = get_openai()
+        self._cache: LRUCache = LRUCache(maxsize=TTS_CACHE_SIZE)
+        self._local_pool = _get_local_pool()
+    
+    @property
+    def concatenable(self) -> bool:
+        """Whether clips can be joined byte-wise (local TTS emits WAV, which can't)"""
+        return self._local_pool is None and settings.TTS_RESPONSE_FORMAT != "flac"
+    
+    def _use_local(self, text: str) -> bool:
+        """Short English text goes to the local voice"""
+        return (
+            self._local_pool is not None
+            and len(text) <= settings.LOCAL_TTS_MAX_CHARS
+            and text.isascii()
+        )
     
-    async def text_to_speech(self, text: str) -> str:
+    def mime_type(self, text: str) -> str:
+        """MIME type of the audio text_to_speech returns for this text (local clips are WAV)"""
+        audio_format = "wav" if self._use_local(text) else settings.TTS_RESPONSE_FORMAT
+        return AUDIO_MIME_TYPES.get(audio_format, "application/octet-stream")
+    
+    async def text_to_speech(self, text: str) -> bytes:
         """
         Convert text to speech
         
@@ -27,24 +111,59 @@ class TTSService:
             text: Text to convert
             
         Returns:
-            Base64 encoded audio
+            Raw audio bytes (empty on error), encoded as mime_type(text)
         """
+        local = self._use_local(text)
+        cache_key = (settings.LOCAL_TTS_MODEL if local else settings.DEFAULT_TTS_VOICE, text)
+        cached = self._cache.get(cache_key)
+        if cached is not None:
+            return cached
+        
         try:
-            response = await self.client.audio.speech.create(
-                model="tts-1",
-                voice=settings.DEFAULT_TTS_VOICE,  # alloy, echo, fable, onyx, nova, shimmer
-                input=text
-            )
-            
-            # Get audio content
-            audio_content = response.content
-            
-            # Encode to base64
-            audio_base64 = base64.b64encode(audio_content).decode('utf-8')
+            if local:
+                loop = asyncio.get_running_loop()
+                audio_content = await loop.run_in_executor(self._local_pool, _synthesize_local, text)
+            else:
+                response = await self.client.audio.speech.create(
+                    model="tts-1",
+                    voice=settings.DEFAULT_TTS_VOICE,  # alloy, echo, fable, onyx, nova, shimmer
+                    input=text,
+                    response_format=settings.TTS_RESPONSE_FORMAT
+                )
+                
+                # Get audio content
+                audio_content = response.content
             
-            logger.info(f"✅ Generated TTS for: {text[:50]}...")
-            return audio_base64
+            self._cache[cache_key] = audio_content
+            logger.info("✅ Generated TTS for: %.50s...", text)
+            return audio_content
             
         except Exception as e:
-            logger.error(f"❌ TTS error: {e}", exc_info=True)
-            return ""
+            logger.error("❌ TTS error: %s", e, exc_info=should_log_tb())
+            return b""
+    
+    async def stream_speech(self, text: str) -> AsyncIterator[Tuple[bytes, str]]:
+        """
+        Convert text to speech sentence by sentence
+        
+        All sentences are synthesized concurrently; audio is yielded in
+        order as soon as each one is ready, so playback can start after
+        the first sentence instead of the whole text.
+        
+        Args:
+            text: Text to convert
+            
+        Yields:
+            (audio, mime_type) per sentence; short sentences may be WAV
+            from the local voice, so decode each chunk on its own
+        """
+        sentences = [s for s in _SENTENCE_SPLIT_RE.split(text.strip()) if s]
+        tasks = [asyncio.create_task(self.text_to_speech(s)) for s in sentences]
+        try:
+            for sentence, task in zip(sentences, tasks):
+                audio = await task
+                if audio:
+                    yield audio, self.mime_type(sentence)
+        finally:
+            for task in tasks:
+                task.cancel()